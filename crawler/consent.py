@@ -0,0 +1,123 @@
+import json
+import os
+from typing import Optional
+
+DEFAULT_PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "consent_patterns.json")
+
+# Finds (and optionally clicks) the best cookie-consent button in one call.
+# Searches the document, open shadow roots and same-origin iframes, polls until
+# a banner button shows up or ``deadlineMs`` passes, and resolves to a small
+# summary of the chosen candidate (or null). Written as a plain async function
+# of one array argument so both Selenium (execute_async_script) and
+# Playwright (page.evaluate) can run it.
+CONSENT_JS = r"""
+async ([patterns, deadlineMs, click]) => {
+    const started = performance.now();
+    const norm = (s) => (s || "")
+        .replace(/\u200c/g, " ").replace(/[\u200d\u0640\u064b-\u065f\u0670]/g, "")
+        .replace(/[\u064a\u0649]/g, "\u06cc").replace(/\u0643/g, "\u06a9")
+        .toLowerCase().replace(/[^\p{L}\p{N}]+/gu, " ").trim();
+    const accept = (patterns.accept_texts || []).map(norm).filter(Boolean);
+    const reject = (patterns.reject_texts || []).map(norm).filter(Boolean);
+    const hints = (patterns.container_keywords || []).map(norm).filter(Boolean);
+    const selectors = patterns.selectors || [];
+    const CLICKABLE = "button, a, [role=button], input[type=button], input[type=submit], [onclick]";
+    const hasPhrase = (text, list) => list.some((p) => ` ${text} `.includes(` ${p} `));
+
+    const roots = () => {
+        const out = [];
+        const stack = [{root: document, frame: null}];
+        while (stack.length) {
+            const item = stack.pop();
+            out.push(item);
+            for (const el of item.root.querySelectorAll("*")) {
+                if (el.shadowRoot) stack.push({root: el.shadowRoot, frame: item.frame});
+                if (el.tagName === "IFRAME" || el.tagName === "FRAME") {
+                    try {
+                        if (el.contentDocument) stack.push({root: el.contentDocument, frame: el.src || el.tagName.toLowerCase()});
+                    } catch (e) { /* cross-origin */ }
+                }
+            }
+        }
+        return out;
+    };
+
+    const visible = (el) => {
+        const r = el.getBoundingClientRect();
+        if (r.width < 2 || r.height < 2) return false;
+        const style = (el.ownerDocument.defaultView || window).getComputedStyle(el);
+        return style.visibility !== "hidden" && style.display !== "none" && style.opacity !== "0";
+    };
+
+    const inBanner = (el) => {
+        let node = el;
+        for (let depth = 0; node && depth < 8; depth++) {
+            const attrs = node.getAttribute ? norm(`${node.id || ""} ${node.getAttribute("class") || ""} ${node.getAttribute("aria-label") || ""}`) : "";
+            if (attrs && hints.some((h) => attrs.includes(h))) return true;
+            node = node.parentElement || (node.getRootNode && node.getRootNode().host) || null;
+        }
+        return false;
+    };
+
+    const score = (el, bySelector) => {
+        const text = norm(el.innerText || el.value || el.getAttribute("aria-label") || el.title);
+        if (text && hasPhrase(text, reject)) return 0;
+        let s = 0;
+        if (text && text.length <= 40) {
+            if (accept.includes(text)) s += 3;
+            else if (hasPhrase(text, accept)) s += 2;
+        }
+        if (bySelector) s += 2;
+        if (!s) return 0;
+        if (inBanner(el)) s += 2;
+        return visible(el) ? s : 0;
+    };
+
+    const describe = (el) => ({
+        tag: el.tagName.toLowerCase(),
+        id: el.id || null,
+        text: (el.innerText || el.value || el.getAttribute("aria-label") || "").trim().slice(0, 80),
+    });
+
+    let best = null;
+    while (true) {
+        for (const {root, frame} of roots()) {
+            const bySelector = new Set();
+            for (const sel of selectors) {
+                try { root.querySelectorAll(sel).forEach((el) => bySelector.add(el)); } catch (e) { /* bad selector */ }
+            }
+            const seen = new Set([...bySelector, ...root.querySelectorAll(CLICKABLE)]);
+            for (const el of seen) {
+                const s = score(el, bySelector.has(el));
+                if (s && (!best || s > best.score)) best = {el, score: s, frame};
+            }
+        }
+        // A button inside a recognised banner is as good as it gets; otherwise
+        // keep polling for late-loading consent managers until the deadline.
+        if ((best && best.score >= 4) || performance.now() - started >= deadlineMs) break;
+        await new Promise((resolve) => setTimeout(resolve, 200));
+    }
+    if (!best) return null;
+    const result = {...describe(best.el), score: best.score, frame: best.frame, clicked: false};
+    if (click) {
+        try { best.el.click(); result.clicked = true; } catch (e) { result.error = String(e); }
+    }
+    return result;
+}
+"""
+
+
+def load_consent_patterns(path: Optional[str] = None) -> dict:
+    """Load consent button patterns (texts, selectors, banner keywords) from JSON."""
+    with open(path or DEFAULT_PATTERNS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_consent_button(driver, patterns: dict, deadline_ms: int = 3000, click: bool = True) -> Optional[dict]:
+    """Run CONSENT_JS through Selenium in a single round-trip."""
+    driver.set_script_timeout(deadline_ms / 1000 + 5)
+    return driver.execute_async_script(
+        "const done = arguments[arguments.length - 1];"
+        f"({CONSENT_JS})(arguments[0]).then(done, (e) => done(null));",
+        [patterns, deadline_ms, click],
+    )
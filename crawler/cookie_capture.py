@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+from crawler.interaction import NetworkMonitor
+from utils.politeness import registrable_domain
+
+
+def parse_set_cookie(line: str, request_url: str) -> Optional[dict]:
+    """Parse one Set-Cookie header line into name, value and lower-cased attributes."""
+    parts = [p.strip() for p in line.split(";")]
+    name, sep, value = parts[0].partition("=")
+    if not sep or not name.strip():
+        return None
+    attrs = {}
+    for part in parts[1:]:
+        key, _, val = part.partition("=")
+        attrs[key.strip().lower()] = val.strip()
+    return {
+        "name": name.strip(),
+        "value": value.strip(),
+        "domain": attrs.get("domain", "").lstrip(".") or (urlparse(request_url).hostname or ""),
+        "path": attrs.get("path") or "/",
+        "expires": attrs.get("expires"),
+        "max_age": attrs.get("max-age"),
+        "secure": "secure" in attrs,
+        "http_only": "httponly" in attrs,
+        "same_site": attrs.get("samesite") or None,
+    }
+
+
+class CookieCapture:
+    """Collects every cookie of a visit from DevTools network events.
+
+    Listens on a ``NetworkMonitor`` for ``Network.requestWillBeSent`` (to know
+    each request's URL and type) and ``Network.responseReceivedExtraInfo``
+    (raw ``Set-Cookie`` headers, including HttpOnly cookies and those of
+    third-party iframes and trackers, plus the ones Chrome blocked). ``collect``
+    merges them with the browser's cookie jar from ``Storage.getCookies``, so
+    each cookie carries its attributes and the request that set it. Pass the
+    ``browser_context_id`` when the visit runs in its own browser context.
+    """
+
+    def __init__(self, monitor: NetworkMonitor, browser_context_id: Optional[str] = None):
+        self.monitor = monitor
+        self.browser_context_id = browser_context_id
+        self._requests: Dict[str, Tuple[str, str]] = {}
+        self._set_cookies: List[Tuple[str, str, List[str]]] = []
+        monitor.listeners.append(self._on_event)
+
+    def _on_event(self, method: str, params: dict):
+        if method == "Network.requestWillBeSent":
+            self._requests[params.get("requestId")] = (
+                params.get("request", {}).get("url", ""), params.get("type", "")
+            )
+        elif method == "Network.responseReceivedExtraInfo":
+            headers = {k.lower(): v for k, v in (params.get("headers") or {}).items()}
+            blocked = {
+                b.get("cookieLine"): b.get("blockedReasons", [])
+                for b in params.get("blockedCookies") or [] if b.get("cookieLine")
+            }
+            for line in filter(None, headers.get("set-cookie", "").split("\n")):
+                self._set_cookies.append((params.get("requestId"), line, blocked.get(line, [])))
+
+    def _jar(self, driver) -> List[dict]:
+        storage_args = {"browserContextId": self.browser_context_id} if self.browser_context_id else {}
+        for command, args in (("Storage.getCookies", storage_args), ("Network.getAllCookies", {})):
+            try:
+                return driver.execute_cdp_cmd(command, args).get("cookies", [])
+            except WebDriverException:
+                continue
+        return driver.get_cookies()
+
+    def _observed(self) -> Dict[Tuple[str, str, str], dict]:
+        """Set-Cookie headers seen during the visit, last one per cookie wins."""
+        observed = {}
+        for request_id, line, blocked in self._set_cookies:
+            url, resource_type = self._requests.get(request_id, ("", ""))
+            cookie = parse_set_cookie(line, url)
+            if cookie is None:
+                continue
+            cookie.update(set_by=url or None, set_by_type=resource_type or None, blocked_reasons=blocked)
+            observed[(cookie["name"], cookie["domain"], cookie["path"])] = cookie
+        return observed
+
+    def collect(self, driver, site_url: str) -> List[dict]:
+        """Return all cookies of the visit in the crawler's document format, with extra attributes."""
+        self.monitor.poll()
+        return self.merge(self._jar(driver), site_url)
+
+    def merge(self, jar: List[dict], site_url: str) -> List[dict]:
+        """Merge a cookie jar in DevTools format with the Set-Cookie headers seen so far."""
+        observed = self._observed()
+        site = registrable_domain(site_url)
+        cookies = []
+
+        for c in jar:
+            domain = c.get("domain", "").lstrip(".")
+            seen = observed.pop((c.get("name"), domain, c.get("path", "/")), None)
+            cookies.append(self._format(
+                domain, c.get("name", ""), c.get("value", ""), site,
+                path=c.get("path", "/"),
+                expires=None if c.get("session") else c.get("expires"),
+                session=bool(c.get("session")),
+                secure=bool(c.get("secure")),
+                http_only=bool(c.get("httpOnly")),
+                same_site=c.get("sameSite"),
+                source="header" if seen else "script",
+                set_by=seen["set_by"] if seen else None,
+                set_by_type=seen["set_by_type"] if seen else None,
+                stored=True,
+                blocked_reasons=[],
+            ))
+
+        # Set by a response but not in the jar: blocked, expired or deleted again.
+        for seen in observed.values():
+            cookies.append(self._format(
+                seen["domain"], seen["name"], seen["value"], site,
+                path=seen["path"],
+                expires=seen["expires"] or seen["max_age"],
+                session=not (seen["expires"] or seen["max_age"]),
+                secure=seen["secure"],
+                http_only=seen["http_only"],
+                same_site=seen["same_site"],
+                source="header",
+                set_by=seen["set_by"],
+                set_by_type=seen["set_by_type"],
+                stored=False,
+                blocked_reasons=seen["blocked_reasons"],
+            ))
+        return cookies
+
+    @staticmethod
+    def _format(domain: str, name: str, value: str, site: str, **attrs) -> dict:
+        return {
+            "Domain": domain,
+            "cookie_domain": f".{domain}" if domain else "",
+            "name": name,
+            "value": value,
+            "third_party": bool(domain) and registrable_domain(domain) != site,
+            **attrs,
+        }
@@ -1,4 +1,3 @@
-import time
 import random
 import re
 from urllib.parse import urlparse
@@ -6,22 +5,67 @@ from datetime import datetime
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException, JavascriptException
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
+from crawler.consent import find_consent_button, load_consent_patterns
+from crawler.interaction import PERFORMANCE_LOGGING, NetworkMonitor, cookie_snapshot, get_profile, scroll_height
+
+# Snapshot of the links worth clicking, taken in one round-trip: visible,
+# at least 2x2 px, same site (ignoring "www."), not an in-page anchor or a
+# mailto:/tel:/javascript: link. Returns a random sample of at most
+# ``limit`` [element, href, width, height] entries.
+LINK_HARVEST_JS = """
+const [pageUrl, limit] = arguments;
+const strip = (h) => h.replace(/^www\\./, "");
+const host = strip(location.hostname);
+const base = pageUrl.split("?")[0].split("#")[0];
+const out = [];
+for (const a of document.getElementsByTagName("a")) {
+    const raw = a.getAttribute("href") || "";
+    const href = a.href;
+    if (!href || raw.startsWith("#") || /^(mailto|tel|javascript):/i.test(href)) continue;
+    if (href === pageUrl || (href.startsWith(base) && href.includes("#"))) continue;
+    let target;
+    try { target = new URL(href); } catch (e) { continue; }
+    if (!/^https?:$/.test(target.protocol) || strip(target.hostname) !== host) continue;
+    const r = a.getBoundingClientRect();
+    if (r.width < 2 || r.height < 2) continue;
+    const style = getComputedStyle(a);
+    if (style.visibility === "hidden" || style.display === "none" || style.opacity === "0") continue;
+    out.push([a, href, Math.floor(r.width), Math.floor(r.height)]);
+}
+for (let i = out.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [out[i], out[j]] = [out[j], out[i]];
+}
+return out.slice(0, limit);
+"""
 
 class CookieCrawler:
-    def __init__(self, mongo_driver):
+    def __init__(self, mongo_driver, consent_patterns=None, consent_deadline=3.0, profile="fast"):
         self.mongo = mongo_driver
+        self.consent_patterns = consent_patterns or load_consent_patterns()
+        self.consent_deadline = consent_deadline
+        # "fast" waits on page events, "human" keeps the fixed random pauses.
+        self.profile = get_profile(profile)
         
     def get_root_url(self, url: str) -> str:
         parsed = urlparse(url)
         return f"{parsed.scheme}://{parsed.netloc}"
     
+    def ensure_indexes(self):
+        """Create the unique index on the crawled root URL."""
+        self.mongo.ensure_index("url", unique=True)
+
     def has_been_crawled(self, root_url):
         """Check if a root URL has already been crawled."""
-        return self.mongo.collection.find_one({"url": root_url}) is not None
+        return self.mongo.already_scraped(root_url)
+
+    def crawled_roots(self, root_urls):
+        """Return which of the root URLs have already been crawled, in bulk."""
+        return self.mongo.existing_values("url", root_urls)
     
     def save_cookies(self, cookies_list, root_url):
         """Save all cookies of a website as a single document in MongoDB."""
@@ -52,6 +96,7 @@ class CookieCrawler:
             "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
         ]
         chrome_options.add_argument(f"user-agent={random.choice(user_agents)}")
+        chrome_options.set_capability("goog:loggingPrefs", PERFORMANCE_LOGGING)
         
         driver = webdriver.Chrome(options=chrome_options)
         driver.maximize_window()
@@ -59,51 +104,49 @@ class CookieCrawler:
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         return driver
     
-    def handle_cookie_banner(self, driver):
-        """Attempt to click cookie consent buttons with multiple strategies."""
-        consent_selectors = [
-            (By.XPATH, "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'accept') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'agree') or contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'ok') or contains(@aria-label, 'accept') or contains(@title, 'accept')]"),
-            (By.CSS_SELECTOR, "button[id*='cookie'][id*='accept'], a[id*='cookie'][id*='accept'], button[class*='cookie'][class*='accept'], a[class*='cookie'][class*='accept']"),
-            (By.XPATH, "//div[contains(@class, 'cookie-consent')]//button | //div[contains(@id, 'cookie-consent')]//button"),
-            (By.XPATH, "//button[text()='Allow all cookies']"),
-            (By.XPATH, "//button[text()='Accepter']"),
-            (By.XPATH, "//button[contains(text(), 'قبول')]"),
-            (By.XPATH, "//button[contains(text(), 'متوجه شدم')]")
-        ]
-        
-        consent_button = None
-        for selector_type, selector_value in consent_selectors:
-            try:
-                consent_button = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((selector_type, selector_value))
-                )
-                if consent_button:
-                    print(f"Found cookie consent button: {selector_value}")
-                    break
-            except TimeoutException:
-                continue
-        
-        if consent_button:
-            try:
-                consent_button.click()
-                print("Clicked cookie consent button.")
-                time.sleep(random.uniform(2, 4))
-            except ElementClickInterceptedException:
-                print("Click intercepted, trying JavaScript click.")
-                driver.execute_script("arguments[0].click();", consent_button)
-                time.sleep(random.uniform(2, 4))
-            except Exception as e:
-                print(f"Error clicking consent button: {e}")
-        else:
+    def handle_cookie_banner(self, driver, monitor=None):
+        """Find and click the cookie consent button with a single injected script.
+
+        All configured English and Persian patterns are checked at once in the
+        document, open shadow roots and same-origin iframes, giving up after
+        ``consent_deadline`` seconds when no banner appears.
+        """
+        try:
+            result = find_consent_button(driver, self.consent_patterns, int(self.consent_deadline * 1000))
+        except (JavascriptException, TimeoutException) as e:
+            print(f"Error detecting cookie consent banner: {e}")
+            return
+
+        if not result:
             print("No cookie consent banner found.")
+        elif result.get("clicked"):
+            where = f" in {result['frame']}" if result.get("frame") else ""
+            print(f"Clicked cookie consent button: {result.get('text') or result.get('id')!r}{where}")
+            self.profile.wait("consent", monitor or NetworkMonitor(driver), lambda: cookie_snapshot(driver))
+        else:
+            print(f"Error clicking consent button: {result.get('error')}")
     
-    def navigate_and_interact(self, driver, url, max_scrolls=3, scroll_pause_time=2):
-        """Navigate to URL, handle cookies, scroll, and simulate human interactions."""
+    def harvest_links(self, driver, url, limit=50):
+        """Return clickable same-site links as (element, href, width, height) tuples.
+
+        Discovery, visibility, size and origin filtering all happen in one
+        ``execute_script`` call instead of several round-trips per anchor.
+        """
+        return [tuple(item) for item in driver.execute_script(LINK_HARVEST_JS, url, limit) or []]
+    
+    def navigate_and_interact(self, driver, url, max_scrolls=3, scroll_pause_time=2, monitor=None):
+        """Navigate to URL, handle cookies, scroll, and simulate human interactions.
+
+        Pauses between steps follow ``self.profile``; ``scroll_pause_time``
+        only applies to the human profile. Pass a ``NetworkMonitor`` created
+        before the visit to observe its DevTools events.
+        """
         if not re.match(r'^https?://', url):
             print(f"Invalid URL format: {url}")
             return False
         
         try:
+            monitor = monitor or NetworkMonitor(driver)
             driver.get(url)
             print(f"Navigating to: {url}")
             WebDriverWait(driver, 20).until(
@@ -112,57 +155,52 @@ class CookieCrawler:
             print("Page loaded successfully.")
             
             # Handle cookie banners
-            self.handle_cookie_banner(driver)
+            self.handle_cookie_banner(driver, monitor)
             
             # Scroll simulation
-            last_height = driver.execute_script("return document.body.scrollHeight")
+            last_height = scroll_height(driver)
             for _ in range(max_scrolls):
                 driver.execute_script("window.scrollBy(0, window.innerHeight * 0.8)")
-                time.sleep(scroll_pause_time + random.uniform(0.5, 1.5))
-                new_height = driver.execute_script("return document.body.scrollHeight")
+                new_height = self.profile.wait("scroll", monitor, lambda: scroll_height(driver), base=scroll_pause_time)
                 if new_height == last_height:
                     break
                 last_height = new_height
             
             # Random link interactions
             try:
-                all_links = driver.find_elements(By.TAG_NAME, "a")
-                clickable_links = []
-                for link in all_links:
-                    href = link.get_attribute('href')
-                    if link.is_displayed() and href and not href.startswith('#') and not href.startswith('mailto:') and not href.startswith('tel:'):
-                        if href != url and not (href.startswith(url.split('?')[0].split('#')[0]) and '#' in href):
-                            clickable_links.append(link)
-                
-                if clickable_links:
-                    num_clicks = min(random.randint(1, 3), len(clickable_links))
+                links = self.harvest_links(driver, url)
+                if links:
+                    num_clicks = min(random.randint(1, 3), len(links))
                     print(f"Clicking {num_clicks} random links.")
-                    for _ in range(num_clicks):
-                        target_link = random.choice(clickable_links)
+                    for n in range(num_clicks):
+                        if n:
+                            # Element references do not survive driver.back(); take a new snapshot.
+                            links = self.harvest_links(driver, url)
+                            if not links:
+                                break
+                        target_link, href, link_width, link_height = random.choice(links)
                         try:
-                            link_width = target_link.size.get('width', 0)
-                            link_height = target_link.size.get('height', 0)
-                            
-                            if link_width > 1 and link_height > 1:
-                                offset_x = random.randint(1, link_width - 1)
-                                offset_y = random.randint(1, link_height - 1)
-                                ActionChains(driver).move_to_element_with_offset(
-                                    target_link, offset_x, offset_y
-                                ).click().perform()
-                                print(f"Clicked: {target_link.get_attribute('href')}")
-                                time.sleep(random.uniform(3, 7))
-                                driver.back()
-                                WebDriverWait(driver, 10).until(
-                                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                                )
-                            else:
-                                print("Skipping tiny/invisible link.")
+                            # Selenium 4 offsets are relative to the element's center.
+                            offset_x = random.randint(-(link_width // 2) + 1, link_width // 2 - 1)
+                            offset_y = random.randint(-(link_height // 2) + 1, link_height // 2 - 1)
+                            ActionChains(driver).move_to_element_with_offset(
+                                target_link, offset_x, offset_y
+                            ).click().perform()
+                            print(f"Clicked: {href}")
+                            self.profile.wait("link", monitor)
+                            driver.back()
+                            WebDriverWait(driver, 10).until(
+                                EC.presence_of_element_located((By.TAG_NAME, "body"))
+                            )
                         except StaleElementReferenceException:
                             print("Stale element reference, skipping.")
                         except ElementClickInterceptedException:
                             print("Click intercepted, skipping.")
             except Exception as e:
                 print(f"Error during link interactions: {e}")
+            
+            # Let cookies set by the last responses land before they are read.
+            self.profile.wait("final", monitor, lambda: cookie_snapshot(driver))
                 
         except TimeoutException:
             print(f"Timeout loading {url}")
@@ -172,8 +210,23 @@ class CookieCrawler:
             return False
         return True
     
-    def extract_cookies(self, driver):
-        """Extract cookies with proper formatting."""
+    def extract_cookies(self, driver, capture=None, site_url=None):
+        """Extract cookies with proper formatting.
+
+        With a ``CookieCapture`` attached to the visit's monitor, every cookie
+        seen on the network or in the browser's jar is returned with its
+        attributes and the request that set it; otherwise only the cookies
+        visible to the current document.
+        """
+        if capture is not None:
+            try:
+                cookies_list = capture.collect(driver, site_url or driver.current_url)
+                third_party = sum(1 for c in cookies_list if c["third_party"])
+                http_only = sum(1 for c in cookies_list if c["http_only"])
+                print(f"Extracted {len(cookies_list)} cookies ({third_party} third-party, {http_only} HttpOnly).")
+                return cookies_list
+            except Exception as e:
+                print(f"Network cookie capture failed, falling back to document cookies: {e}")
         cookies_list = []
         try:
             all_cookies = driver.get_cookies()
@@ -0,0 +1,151 @@
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+# Capability that makes chromedriver record DevTools events (Network.*,
+# Page.*) in the "performance" log, which NetworkMonitor reads.
+PERFORMANCE_LOGGING = {"performance": "ALL"}
+
+
+class NetworkMonitor:
+    """Tracks in-flight requests of one site visit from Chrome's performance log.
+
+    Each ``poll`` drains the log (one round-trip) and passes every DevTools
+    event to the registered listeners, so several consumers can share it. The
+    network counts as idle when at most ``max_inflight`` requests are pending;
+    requests pending longer than ``stale_after`` seconds (long-polling,
+    beacons) are ignored. ``origins`` collects every http(s) origin the visit
+    requested. Without performance logging the monitor reports the network as
+    always idle.
+    """
+
+    def __init__(self, driver, max_inflight: int = 2, stale_after: float = 10.0,
+                 poll_interval: float = 0.1):
+        self.driver = driver
+        self.max_inflight = max_inflight
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.listeners: List[Callable[[str, dict], None]] = []
+        self._inflight: Dict[str, float] = {}
+        self.origins: Set[str] = set()
+        self.last_activity = time.monotonic()
+        try:
+            # Events of earlier visits belong to other sites.
+            self.driver.get_log("performance")
+            self.available = True
+        except WebDriverException:
+            self.available = False
+
+    def poll(self) -> int:
+        """Drain the log and dispatch its events; return how many network events arrived."""
+        if not self.available:
+            return 0
+        now = time.monotonic()
+        count = 0
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method", ""), message.get("params", {})
+            if method == "Network.requestWillBeSent":
+                self._inflight[params.get("requestId")] = now
+                target = urlparse(params.get("request", {}).get("url", ""))
+                if target.scheme in ("http", "https"):
+                    self.origins.add(f"{target.scheme}://{target.netloc}")
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self._inflight.pop(params.get("requestId"), None)
+            if method.startswith("Network."):
+                count += 1
+            for listener in self.listeners:
+                listener(method, params)
+        if count:
+            self.last_activity = now
+        return count
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        pending = sum(1 for started in self._inflight.values() if now - started < self.stale_after)
+        return pending <= self.max_inflight
+
+    def wait_settled(self, probe: Optional[Callable[[], object]] = None, quiet: float = 0.5,
+                     timeout: float = 3.0) -> Tuple[object, bool]:
+        """Wait until the network is idle and ``probe()`` stopped changing for quiet seconds.
+
+        Returns the last probe value and whether the page settled before timeout.
+        """
+        start = last_change = time.monotonic()
+        value = probe() if probe else None
+        while True:
+            time.sleep(self.poll_interval)
+            self.poll()
+            now = time.monotonic()
+            if probe:
+                current = probe()
+                if current != value:
+                    value, last_change = current, now
+            if self.idle() and now - max(last_change, self.last_activity) >= quiet:
+                return value, True
+            if now - start >= timeout:
+                return value, False
+
+
+def cookie_snapshot(driver) -> frozenset:
+    """Every cookie in the browser (third-party included) as a comparable set."""
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+    except WebDriverException:
+        cookies = driver.get_cookies()
+    return frozenset((c.get("name"), c.get("domain"), c.get("path"), c.get("value")) for c in cookies)
+
+
+def scroll_height(driver) -> int:
+    return driver.execute_script("return document.body ? document.body.scrollHeight : 0")
+
+
+class HumanProfile:
+    """The original human-like timing: fixed random pauses after each step."""
+
+    name = "human"
+    PAUSES = {"consent": (2, 4), "scroll": (0.5, 1.5), "link": (3, 7), "final": (0, 0)}
+
+    def wait(self, step: str, monitor: NetworkMonitor, probe: Optional[Callable[[], object]] = None,
+             base: float = 0.0):
+        low, high = self.PAUSES[step]
+        if base or high:
+            time.sleep(base + random.uniform(low, high))
+        return probe() if probe else None
+
+
+class FastProfile:
+    """Event-driven waits: each step ends as soon as the page has settled.
+
+    A step is settled once the network is idle and its probe (the cookie jar
+    after consent and at the end of a visit, the scroll height after a scroll)
+    stopped changing. ``WAITS`` holds the (quiet, timeout) seconds per step,
+    so every wait is tightly bounded.
+    """
+
+    name = "fast"
+    WAITS = {"consent": (0.5, 3.0), "scroll": (0.3, 1.5), "link": (0.5, 4.0), "final": (0.5, 2.0)}
+
+    def wait(self, step: str, monitor: NetworkMonitor, probe: Optional[Callable[[], object]] = None,
+             base: float = 0.0):
+        quiet, timeout = self.WAITS[step]
+        value, _ = monitor.wait_settled(probe, quiet, timeout)
+        return value
+
+
+PROFILES = {"fast": FastProfile, "human": HumanProfile}
+
+
+def get_profile(name: str):
+    """Return a new interaction profile by name ("fast" or "human")."""
+    try:
+        return PROFILES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown interaction profile: {name}")
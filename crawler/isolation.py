@@ -0,0 +1,88 @@
+from typing import Optional, Set
+
+from selenium.common.exceptions import WebDriverException
+
+from crawler.interaction import NetworkMonitor
+
+ISOLATION_MODES = ("none", "clear", "context")
+
+
+class SiteIsolation:
+    """Keeps one site's browser state out of the next on a reused driver.
+
+    Modes:
+    - ``none``: cookies and storage carry over between sites
+    - ``clear``: before each site, wipe cookies, the cache and the storage of
+      every origin the previous site used, through DevTools
+    - ``context``: visit each site in a fresh incognito-like browser context
+      (``Target.createBrowserContext``) that is disposed afterwards
+
+    Holds per-driver state, so each worker uses its own instance.
+    """
+
+    def __init__(self, mode: str = "clear"):
+        if mode not in ISOLATION_MODES:
+            raise ValueError(f"Unknown isolation mode: {mode}")
+        self.mode = mode
+        self._origins: Set[str] = set()
+        self._context: Optional[str] = None
+        self._home: Optional[str] = None
+
+    def reset(self):
+        """Forget state of a driver that was replaced."""
+        self._origins.clear()
+        self._context = self._home = None
+
+    def begin(self, driver) -> Optional[str]:
+        """Prepare a clean state for the next site; return its browser context id, if any."""
+        if self.mode == "clear":
+            self._clear(driver)
+        elif self.mode == "context":
+            try:
+                return self._open_context(driver)
+            except WebDriverException as e:
+                print(f"[WARN] browser contexts unavailable ({type(e).__name__}); clearing state between sites instead")
+                self.mode = "clear"
+                self._clear(driver)
+        return None
+
+    def end(self, driver, monitor: Optional[NetworkMonitor] = None):
+        """Finish a site: remember the origins it used and drop its context."""
+        if monitor is not None:
+            self._origins |= monitor.origins
+        if self._context is not None:
+            self._close_context(driver)
+
+    def _clear(self, driver):
+        # Leave the previous page first so it cannot write anything back.
+        driver.get("about:blank")
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        for origin in self._origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        self._origins.clear()
+
+    def _open_context(self, driver) -> str:
+        context = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+        before = set(driver.window_handles)
+        try:
+            target = driver.execute_cdp_cmd(
+                "Target.createTarget", {"url": "about:blank", "browserContextId": context}
+            )["targetId"]
+        except WebDriverException:
+            driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context})
+            raise
+        self._home = driver.current_window_handle
+        self._context = context
+        handles = driver.window_handles
+        # chromedriver uses target ids as window handles; fall back to the new handle.
+        driver.switch_to.window(target if target in handles else next(h for h in handles if h not in before))
+        return context
+
+    def _close_context(self, driver):
+        context, self._context = self._context, None
+        try:
+            driver.close()
+            driver.switch_to.window(self._home)
+        finally:
+            driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context})
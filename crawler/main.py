@@ -1,12 +1,15 @@
 import os
-import time
-import random
-import pandas as pd
 import argparse
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from utils.mongo_driver import MongoDriver
+from utils.politeness import DomainRateLimiter
+from crawler.consent import load_consent_patterns
 from crawler.crawler import CookieCrawler
+from crawler.interaction import PERFORMANCE_LOGGING, PROFILES
+from crawler.isolation import ISOLATION_MODES
+from crawler.result_writer import open_result_writer
+from crawler.worker_pool import CrawlWorkerPool
 
 def initialize_driver(headless=True):
     """Initialize Selenium WebDriver."""
@@ -20,28 +23,39 @@ def initialize_driver(headless=True):
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.set_capability("goog:loggingPrefs", PERFORMANCE_LOGGING)
     driver = webdriver.Chrome(options=chrome_options)
     driver.maximize_window()
     driver.implicitly_wait(10)
     driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
     return driver
 
-def save_to_csv(all_cookies, output_file="collected_cookies.csv"):
-    """Save cookies to CSV."""
-    if not all_cookies:
-        return
-    df = pd.DataFrame(all_cookies)
-    target_columns = ['Domain', 'cookie_domain', 'name', 'value']
-    df = df.reindex(columns=target_columns, fill_value=None)
-    df.to_csv(output_file, index=False, encoding='utf-8')
-    print(f"Cookies saved to {output_file}")
-
 def parse_arguments():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(description="Cookie Crawler")
     parser.add_argument("--input", type=str, default="urls.txt", help="Path to file with URLs (one per line)")
     parser.add_argument("--url", type=str, help="Single URL to crawl")
-    parser.add_argument("--output", type=str, default="collected_cookies.csv", help="Output CSV file path")
+    parser.add_argument("--output", type=str, default="collected_cookies.csv",
+                        help="Output file, appended to as sites finish (.parquet for Parquet, CSV otherwise)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="Output format (default: from the --output extension)")
+    parser.add_argument("--domain-delay", type=float, default=10.0,
+                        help="Minimum seconds between visits to the same registrable domain")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Parallel browser workers (default: half the CPU cores)")
+    parser.add_argument("--sites-per-browser", type=int, default=50,
+                        help="Restart a worker's browser after this many sites (0 = never)")
+    parser.add_argument("--retries", type=int, default=1,
+                        help="Retries of a site whose browser crashed")
+    parser.add_argument("--consent-config", type=str, default=None,
+                        help="JSON file with cookie consent patterns (default: crawler/consent_patterns.json)")
+    parser.add_argument("--consent-timeout", type=float, default=3.0,
+                        help="Seconds to wait for a cookie consent banner to appear")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast",
+                        help="Interaction timing: 'fast' waits on page events, 'human' keeps random pauses")
+    parser.add_argument("--isolation", choices=ISOLATION_MODES, default="clear",
+                        help="Per-site browser state: 'clear' wipes cookies/storage between sites, "
+                             "'context' uses a fresh browser context per site, 'none' keeps everything")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode with sample URL")
     return parser.parse_args()
 
@@ -57,46 +71,42 @@ def load_urls(args):
     else:
         raise ValueError("Provide either --input, --url, or enable --debug mode")
 
-def setup_crawler() -> CookieCrawler:
+def setup_crawler(consent_config=None, consent_timeout=3.0, profile="fast") -> CookieCrawler:
     """Initialize database connection and crawler instance."""
     mongo = MongoDriver(collection="crawled_cookies")
-    return CookieCrawler(mongo)
+    crawler = CookieCrawler(mongo, load_consent_patterns(consent_config), consent_timeout, profile)
+    crawler.ensure_indexes()
+    return crawler
+
+def execute_crawl(crawler : CookieCrawler, urls, limiter: DomainRateLimiter = None, workers: int = 1,
+                  sites_per_browser: int = 50, retries: int = 1, isolation: str = "clear", writer=None):
+    """Execute the crawling process for all URLs on ``workers`` parallel browsers.
 
-def execute_crawl(crawler : CookieCrawler, driver, urls):
-    """Execute the crawling process for all URLs."""
-    all_cookies = []
-    for i, url in enumerate(urls):
-        root_url = crawler.get_root_url(url)
-        if crawler.has_been_crawled(root_url):
-            print(f"Skipping {url} (already crawled).")
-            continue
-            
-        print(f"\n--- Processing {i+1}/{len(urls)}: {url} ---")
-        if crawler.navigate_and_interact(driver, url, max_scrolls=5, scroll_pause_time=2):
-            cookies = crawler.extract_cookies(driver)
-            if cookies:
-                crawler.save_cookies(cookies, root_url)
-                all_cookies.extend(cookies)
-        else:
-            print(f"Failed to crawl {url}")
-            
-        time.sleep(random.uniform(5, 10))
-    return all_cookies
+    Visits to the same registrable domain are spaced by ``limiter``; other
+    domains proceed without waiting. Each site's cookies are streamed to
+    ``writer`` as soon as the site is done. Returns the number of cookies.
+    """
+    crawled = crawler.crawled_roots(crawler.get_root_url(url) for url in urls)
+    pool = CrawlWorkerPool(
+        crawler, lambda: initialize_driver(headless=True), workers=workers, limiter=limiter,
+        max_sites_per_driver=sites_per_browser, retries=retries, isolation=isolation,
+        on_site=writer.write_site if writer else None,
+    )
+    return pool.run(urls, skip=crawled)
 
 def main():
     args = parse_arguments()
     urls = load_urls(args)
     print(f"Loaded {len(urls)} URLs.")
     
-    driver = initialize_driver(headless=True)
-    crawler = setup_crawler()
-    
-    try:
-        all_cookies = execute_crawl(crawler, driver, urls)
-    finally:
-        driver.quit()
-        
-    save_to_csv(all_cookies, args.output)
+    crawler = setup_crawler(args.consent_config, args.consent_timeout, args.profile)
+    delay = max(args.domain_delay, 0.0)
+    limiter = DomainRateLimiter(rate=1 / delay if delay else 0, burst=1, max_concurrent=1)
+    with open_result_writer(args.output, args.format) as writer:
+        total = execute_crawl(crawler, urls, limiter, workers=args.workers,
+                              sites_per_browser=args.sites_per_browser, retries=args.retries,
+                              isolation=args.isolation, writer=writer)
+    print(f"{total} cookies saved to {writer.path}")
 
 if __name__ == "__main__":
     main()
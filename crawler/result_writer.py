@@ -0,0 +1,138 @@
+import csv
+import os
+import threading
+from typing import List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV output keeps working without the optional dependency
+    pa = pq = None
+
+# The first four are the original CSV columns; the rest come from network capture.
+COLUMNS = [
+    "Domain", "cookie_domain", "name", "value", "site", "path", "expires", "session",
+    "secure", "http_only", "same_site", "third_party", "source", "set_by", "set_by_type", "stored",
+]
+BOOL_COLUMNS = {"session", "secure", "http_only", "third_party", "stored"}
+# Low-cardinality columns stored as dictionary indexes in Parquet.
+DICTIONARY_COLUMNS = ["Domain", "cookie_domain", "name", "site", "same_site", "source", "set_by_type"]
+
+
+def _free_path(path: str, tag: str) -> str:
+    """First ``name.<tag>N.ext`` next to path that does not exist yet."""
+    root, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(f"{root}.{tag}{n}{ext}"):
+        n += 1
+    return f"{root}.{tag}{n}{ext}"
+
+
+def _rows(site: str, cookies: List[dict]) -> List[dict]:
+    rows = []
+    for cookie in cookies:
+        row = {col: cookie.get(col) for col in COLUMNS}
+        row["site"] = site
+        if row["expires"] is not None:
+            row["expires"] = str(row["expires"])
+        rows.append(row)
+    return rows
+
+
+class CsvResultWriter:
+    """Appends each site's cookies to a CSV file as soon as the site finishes.
+
+    An existing file is extended (its header is kept), so a crashed or resumed
+    crawl never loses the rows already written. A file with other columns
+    (e.g. the old four-column output) is moved aside to ``name.oldN.csv``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, newline="", encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+            if header != COLUMNS:
+                moved = _free_path(path, "old")
+                os.replace(path, moved)
+                print(f"[WARN] {path} has different columns; moved it to {moved}")
+                exists = False
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS, extrasaction="ignore")
+        if not exists:
+            self._writer.writeheader()
+        self._lock = threading.Lock()
+
+    def write_site(self, site: str, cookies: List[dict]):
+        with self._lock:
+            self._writer.writerows(_rows(site, cookies))
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ParquetResultWriter:
+    """Writes each site's cookies as one Parquet row group.
+
+    Domain, name and the other repetitive string columns are
+    dictionary-encoded, which keeps files small and analytical reads fast.
+    The footer is written by ``close``, so always use it as a context manager.
+
+    Parquet files cannot be appended to: when path already exists, a resumed
+    crawl writes ``name.partN.parquet`` next to it instead, and the files
+    together form one dataset (``pyarrow.dataset.dataset([...])``).
+    """
+
+    def __init__(self, path: str):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet output")
+        if os.path.exists(path):
+            path = _free_path(path, "part")
+            print(f"[WARN] Parquet output exists; writing this run to {path}")
+        self.path = path
+        fields = []
+        for col in COLUMNS:
+            if col in BOOL_COLUMNS:
+                fields.append(pa.field(col, pa.bool_()))
+            elif col in DICTIONARY_COLUMNS:
+                fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(col, pa.string()))
+        self.schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd",
+                                        use_dictionary=DICTIONARY_COLUMNS)
+        self._lock = threading.Lock()
+
+    def write_site(self, site: str, cookies: List[dict]):
+        if not cookies:
+            return
+        table = pa.Table.from_pylist(_rows(site, cookies), schema=self.schema)
+        with self._lock:
+            self._writer.write_table(table)
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_result_writer(path: str, fmt: Optional[str] = None):
+    """Open a streaming writer; the format defaults to the file extension (CSV otherwise)."""
+    fmt = fmt or ("parquet" if path.lower().endswith((".parquet", ".pq")) else "csv")
+    if fmt == "parquet":
+        return ParquetResultWriter(path)
+    return CsvResultWriter(path)
@@ -0,0 +1,188 @@
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from selenium.common.exceptions import WebDriverException
+
+from crawler.cookie_capture import CookieCapture
+from crawler.crawler import CookieCrawler
+from crawler.interaction import NetworkMonitor
+from crawler.isolation import SiteIsolation
+from utils.politeness import DomainRateLimiter
+
+
+class CrawlWorkerPool:
+    """Crawls sites in parallel, one Chrome instance per worker thread.
+
+    Features:
+    - a shared work queue; each worker owns its driver for its whole lifetime
+    - drivers restarted after ``max_sites_per_driver`` sites to bound memory
+    - crash recovery: a dead browser is replaced and the site retried up to
+      ``retries`` times before it counts as failed
+    - the URLs of one root are queued together; the next one is tried when a
+      visit fails, so one bad URL does not skip the whole site
+    - per-domain politeness through the shared ``DomainRateLimiter``
+    - per-site state isolation on the reused drivers (see ``SiteIsolation``)
+
+    Threads are enough here: the work happens in the browser processes, and
+    each worker only waits on its chromedriver.
+    """
+
+    def __init__(self, crawler: CookieCrawler, driver_factory: Callable[[], object],
+                 workers: int = 4, limiter: Optional[DomainRateLimiter] = None,
+                 max_sites_per_driver: int = 50, retries: int = 1, isolation: str = "clear",
+                 on_site: Optional[Callable[[str, List[dict]], None]] = None):
+        self.crawler = crawler
+        self.driver_factory = driver_factory
+        self.workers = max(1, workers)
+        self.limiter = limiter or DomainRateLimiter(rate=0.1, burst=1, max_concurrent=1)
+        self.max_sites_per_driver = max_sites_per_driver
+        self.retries = retries
+        self.isolation = isolation
+        self.on_site = on_site
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._cookie_count = 0
+        self._total = 0
+        self._drivers: Set[object] = set()
+
+    def run(self, urls: Iterable[str], skip: Optional[Set[str]] = None) -> int:
+        """Crawl every URL whose root is not in skip; return the number of cookies collected.
+
+        Each site's cookies go to ``on_site(root_url, cookies)`` as soon as the
+        site is done, so nothing accumulates over the run.
+        """
+        skip = set(skip or ())
+        sites: Dict[str, List[str]] = {}
+        for url in urls:
+            root_url = self.crawler.get_root_url(url)
+            if root_url in skip:
+                print(f"Skipping {url} (already crawled).")
+                continue
+            sites.setdefault(root_url, []).append(url)
+        for site_urls in sites.values():
+            self._queue.put(site_urls)
+            self._total += 1
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+        threads = [
+            threading.Thread(target=self._work, args=(n,), name=f"crawl-worker-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        try:
+            for t in threads:
+                t.join()
+        except KeyboardInterrupt:
+            # Workers are daemon threads: close their browsers here, or the
+            # interpreter exits and leaves chromedriver and Chrome running.
+            self._stop.set()
+            self._quit_all()
+            for t in threads:
+                t.join(timeout=5)
+            raise
+        return self._cookie_count
+
+    def _start_driver(self, worker_id: int):
+        print(f"[POOL] worker {worker_id} starting browser")
+        driver = self.driver_factory()
+        with self._lock:
+            self._drivers.add(driver)
+        if self._stop.is_set():
+            # Interrupted while the browser was starting.
+            self._quit(driver)
+        return driver
+
+    def _quit(self, driver):
+        if driver is None:
+            return
+        with self._lock:
+            self._drivers.discard(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _quit_all(self):
+        with self._lock:
+            drivers = list(self._drivers)
+        for driver in drivers:
+            self._quit(driver)
+
+    @staticmethod
+    def _check_alive(driver):
+        """Raise WebDriverException when the browser behind driver is gone."""
+        driver.execute_script("return 1")
+
+    def _visit(self, driver, url: str, isolation: SiteIsolation) -> Optional[List[dict]]:
+        context = isolation.begin(driver)
+        monitor = NetworkMonitor(driver)
+        try:
+            capture = CookieCapture(monitor, context)
+            with self.limiter.limit_sync(url):
+                ok = self.crawler.navigate_and_interact(driver, url, max_scrolls=5, scroll_pause_time=2,
+                                                        monitor=monitor)
+            if not ok:
+                # navigate_and_interact swallows errors; tell a crash from a bad site.
+                self._check_alive(driver)
+                print(f"Failed to crawl {url}")
+                return None
+            return self.crawler.extract_cookies(driver, capture, self.crawler.get_root_url(url))
+        finally:
+            isolation.end(driver, monitor)
+
+    def _work(self, worker_id: int):
+        driver = None
+        visits = 0
+        isolation = SiteIsolation(self.isolation)
+        try:
+            while not self._stop.is_set():
+                site_urls = self._queue.get()
+                if site_urls is None:
+                    return
+                done = self._total - self._queue.qsize() + self.workers
+
+                cookies = None
+                for url in site_urls:
+                    if self._stop.is_set():
+                        break
+                    print(f"\n--- [worker {worker_id}] Processing {done}/{self._total}: {url} ---")
+                    for attempt in range(self.retries + 1):
+                        try:
+                            if driver is None:
+                                driver, visits = self._start_driver(worker_id), 0
+                                isolation.reset()
+                            cookies = self._visit(driver, url, isolation)
+                            break
+                        except WebDriverException as e:
+                            if self._stop.is_set():
+                                break
+                            print(f"[WARN][worker {worker_id}] browser failed on {url} "
+                                  f"({type(e).__name__}), attempt {attempt + 1}/{self.retries + 1}")
+                            self._quit(driver)
+                            driver = None
+                    visits += 1
+                    if cookies is not None:
+                        # The site was visited; its other URLs are not needed.
+                        break
+
+                if cookies:
+                    root_url = self.crawler.get_root_url(url)
+                    try:
+                        self.crawler.save_cookies(cookies, root_url)
+                        if self.on_site:
+                            self.on_site(root_url, cookies)
+                    except Exception as e:
+                        print(f"[FAIL] saving cookies for {url} ({type(e).__name__}: {e})")
+                    with self._lock:
+                        self._cookie_count += len(cookies)
+
+                if driver is not None and self.max_sites_per_driver and visits >= self.max_sites_per_driver:
+                    print(f"[POOL] worker {worker_id} recycling browser after {visits} sites")
+                    self._quit(driver)
+                    driver = None
+        finally:
+            self._quit(driver)
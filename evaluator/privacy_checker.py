@@ -51,10 +51,8 @@ class PrivacyChecker:
         return violations
 
     def process_site(self, root_url: str):
-        if self.target_driver.collection.find_one({"url": root_url}):
-            return None
-
-        cookie_doc = self.cookie_driver.collection.find_one({"root_url": root_url})
+        # Already evaluated sites are filtered out in bulk by run().
+        cookie_doc = self.cookie_driver.collection.find_one({"url": root_url})
         practice_doc = self.practice_driver.collection.find_one({"url": root_url})
 
         if not cookie_doc or not practice_doc:
@@ -82,10 +80,18 @@ class PrivacyChecker:
         print(f"[OK] Privacy check saved for {root_url}")
         return result_doc
 
+    def _ensure_indexes(self):
+        self.target_driver.ensure_index("url", unique=True)
+        self.practice_driver.ensure_index("url", unique=True)
+        self.cookie_driver.ensure_index("url", unique=True)
+
     def run(self):
-        cursor = self.cookie_driver.collection.find()
-        for doc in cursor:
-            url = doc["root_url"]
+        self._ensure_indexes()
+        urls = [doc["url"] for doc in self.cookie_driver.collection.find({}, {"url": 1})]
+        done = self.target_driver.existing_values("url", urls)
+        for url in urls:
+            if url in done:
+                continue
             self.process_site(url)
 
     def generate_report(self):
@@ -3,7 +3,7 @@ import re
 from urllib.parse import urlparse
 import openai
 from utils.mongo_driver import MongoDriver
-from typing import Optional
+from typing import Dict, List, Optional, Set
 
 LLM_MODEL = "gpt-4.1-nano-2025-04-14"
 
@@ -27,6 +27,11 @@ class PromptApi:
         )
         self.source_driver = MongoDriver(collection="scraped_pages")
         self.target_driver = MongoDriver(collection="processed_prompts")
+        self._prefetched: Set[str] = set()
+        self._processed: Dict[str, dict] = {}
+        # url and text_hash of the one source page per site used for both the
+        # prompt and its hash; the text is loaded only when a site is processed.
+        self._sources: Dict[str, dict] = {}
         
         self._load_initial_resources()
 
@@ -165,16 +170,40 @@ class PromptApi:
         self._save_result(result_doc, url)
         return result_doc
 
+    def _ensure_indexes(self):
+        """Create the indexes used by the lookups of this stage"""
+        self.target_driver.ensure_index("url", unique=True)
+        self.source_driver.ensure_index("site_url")
+
+    def _prefetch_state(self, urls: List[str]):
+        """Load processed results and source page hashes for all URLs in bulk"""
+        processed = self.target_driver.lookup("url", urls, ["source_text_hash"])
+        sources = self.source_driver.lookup("site_url", urls, ["url", "text_hash"])
+        self._processed.update(processed)
+        self._sources.update(sources)
+        self._prefetched.update(urls)
+
     def _is_already_processed(self, url: str) -> bool:
-        """Check if URL has already been processed"""
-        if self.target_driver.collection.find_one({"url": url}):
-            print(f"[SKIP] Already processed: {url}")
-            return True
-        return False
+        """Check if URL has already been processed from the current source text"""
+        if url not in self._prefetched:
+            self._prefetch_state([url])
+        processed = self._processed.get(url)
+        if not processed:
+            return False
+        stored_hash = processed.get("source_text_hash")
+        source_hash = self._sources.get(url, {}).get("text_hash")
+        if stored_hash and source_hash and stored_hash != source_hash:
+            print(f"[STALE] Source text changed, reprocessing: {url}")
+            return False
+        print(f"[SKIP] Already processed: {url}")
+        return True
 
     def _get_source_document(self, url: str) -> Optional[dict]:
-        """Retrieve document content from source database"""
-        doc = self.source_driver.collection.find_one({"site_url": url})
+        """Load the source document of a site, the same page its prefetched hash came from"""
+        if url not in self._prefetched:
+            self._prefetch_state([url])
+        source = self._sources.get(url)
+        doc = self.source_driver.collection.find_one({"url": source["url"]}) if source else None
         if not doc:
             print(f"[ERROR] No document found for {url}")
         return doc
@@ -228,6 +257,7 @@ class PromptApi:
             "raw_file": self.data_practice_prompt_path,
             "normalized_file": self.normalize_prompt_path,
             "appended_doc_text": doc["text"],
+            "source_text_hash": doc.get("text_hash"),
             "response_raw": extracted_data,
             "response_normalized": normalized_data,
             "replaced_response": replaced_data,
@@ -236,7 +266,9 @@ class PromptApi:
 
     def _save_result(self, result_doc: dict, url: str):
         """Save the result document to the target database"""
-        self.target_driver.insert_doc(result_doc)
+        self.target_driver.replace_doc(result_doc)
+        self._processed[url] = {"source_text_hash": result_doc["source_text_hash"]}
+        self._sources[url] = {**self._sources.get(url, {}), "text_hash": result_doc["source_text_hash"]}
         print(f"[OK] Saved responses for {url}")
 
     def run(self):
@@ -248,5 +280,7 @@ class PromptApi:
         if self.debug:
             urls = ["https://www.digikala.com"]
             
+        self._ensure_indexes()
+        self._prefetch_state([self.get_root_url(url) for url in urls])
         for url in urls:
             self.process_url(url)
\ No newline at end of file
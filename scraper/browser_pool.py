@@ -0,0 +1,127 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+
+class _PooledBrowser:
+    """A launched browser plus the bookkeeping needed to decide when to recycle it."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = 0
+
+
+class BrowserPool:
+    """Pool of long-lived Chromium browsers handing out isolated contexts.
+
+    Features:
+    - ``size`` browsers launched once and shared by all scraper workers
+    - a fresh ``BrowserContext`` per URL, so cookies and storage never leak
+    - browsers recycled after ``max_pages`` pages or above ``max_memory_mb`` RSS
+    """
+
+    def __init__(self, pw, size: int = 3, max_pages: int = 50,
+                 max_memory_mb: int = 1024, headless: bool = True):
+        self.pw = pw
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.headless = headless
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[_PooledBrowser] = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Launch all browsers of the pool."""
+        self._idle = asyncio.Queue()
+        launched = await asyncio.gather(*(self._launch() for _ in range(self.size)))
+        for entry in launched:
+            self._idle.put_nowait(entry)
+
+    async def close(self):
+        """Close every browser, idle or not."""
+        for entry in list(self._all):
+            await self._close_browser(entry)
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self.pw.chromium.launch(headless=self.headless)
+        entry = _PooledBrowser(browser)
+        self._all.append(entry)
+        return entry
+
+    async def _close_browser(self, entry: _PooledBrowser):
+        if entry in self._all:
+            self._all.remove(entry)
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            print(f"[WARN][pool] closing browser failed ({type(e).__name__}: {e})")
+
+    async def _memory_mb(self, entry: _PooledBrowser) -> float:
+        """Resident memory of the browser's process tree in MB (0 when unknown).
+
+        Process ids come from the DevTools ``SystemInfo`` domain; sizes are read
+        from ``/proc``, so the check is a no-op on platforms without it.
+        """
+        try:
+            session = await entry.browser.new_browser_cdp_session()
+            try:
+                info = await session.send("SystemInfo.getProcessInfo")
+            finally:
+                await session.detach()
+        except Exception:
+            return 0.0
+
+        page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        total = 0
+        for proc in info.get("processInfo", []):
+            try:
+                with open(f"/proc/{proc['id']}/statm") as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, KeyError, ValueError, IndexError):
+                continue
+        return total / (1024 * 1024)
+
+    async def _needs_recycle(self, entry: _PooledBrowser) -> bool:
+        if not entry.browser.is_connected():
+            return True
+        if self.max_pages and entry.pages >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            return await self._memory_mb(entry) > self.max_memory_mb
+        return False
+
+    async def _release(self, entry: _PooledBrowser):
+        entry.pages += 1
+        if await self._needs_recycle(entry):
+            print(f"[POOL] recycling browser after {entry.pages} pages")
+            await self._close_browser(entry)
+            try:
+                entry = await self._launch()
+            except Exception as e:
+                # The dead entry goes back; the next release retries the launch.
+                print(f"[WARN][pool] relaunching browser failed ({type(e).__name__}: {e})")
+        self._idle.put_nowait(entry)
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        """Borrow a browser and yield a fresh isolated context on it."""
+        entry = await self._idle.get()
+        context = None
+        try:
+            context = await entry.browser.new_context(**context_options)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self._release(entry)
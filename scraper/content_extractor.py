@@ -1,8 +1,35 @@
 # content_extractor.py
 import re
 import math
-from bs4 import BeautifulSoup, NavigableString, Tag
-from typing import List, Tuple, Optional
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from typing import Dict, List, NamedTuple, Tuple, Optional
+
+from scraper.keyword_matcher import KeywordMatcher
+
+# String classes that Tag.get_text() includes by default.
+_TEXT_TYPES = (NavigableString, CData)
+
+_NAV_MARKER_RE = re.compile(
+    r"\b(nav|navigation|footer|header|menu|breadcrumb|cookie|ads|navbar|site-footer|footer-shadow|fixed bottom)\b",
+    flags=re.I,
+)
+
+# Distance used for nodes without any marked ancestor.
+_NO_MARKER = 1 << 30
+
+
+class SubtreeStats(NamedTuple):
+    """Text statistics of an element's whole subtree, as get_text would see it."""
+    words: int
+    keywords: int
+    chars: int
+    parts: int
+    nav: bool
+
+    @property
+    def text_len(self) -> int:
+        """Length of the cleaned, space-joined subtree text."""
+        return self.chars + max(self.parts - 1, 0)
 
 
 class ContentExtractor:
@@ -11,19 +38,36 @@ class ContentExtractor:
     - container scoring (keyword density) to find content areas
     - multi-threshold: select all containers above given score
     - structured parsing: dl/dt/dd and heading-based sections
-    - substring keyword matching (keyword can be substring of a word)
-    - ancestor-aware nav/footer detection
+    - substring keyword matching (keyword can be substring of a word),
+      one automaton pass per text, Persian letter variants folded
+    - ancestor-aware nav/footer detection, memoized per document
+    - single parse: text blocks and the candidate report come from one DOM
+    - one post-order pass caches word/keyword counts per element, so
+      nested containers and sections are scored by lookup
     """
 
+    # CSS selectors of the containers that may hold policy text.
+    CANDIDATE_SELECTORS = [
+        "main", "article", "section",
+        "div#content", "div[id*='content']", "div[class*='content']",
+        "div[class*='privacy']", "div[id*='privacy']", "dl", "body",
+        "div[class*='terms']", "div[id*='terms']",
+        "div[class*='policy']", "div[id*='policy']",
+        "div[class*='legal']", "div[id*='legal']",
+    ]
+
     def __init__(self, keywords: List[str], min_line_length: int = 10,
                  container_score_threshold: float = 0.05,
                  multi_container_threshold: float = 0.2):
         self.keywords = [kw.lower() for kw in keywords]
+        self._matcher = KeywordMatcher(keywords)
         self.min_line_length = min_line_length
         self.min_section_words = max(5, self.min_line_length // 2)
         self.container_score_threshold = container_score_threshold
         self.multi_container_threshold = multi_container_threshold
         self._ancestor_check_depth = 6
+        self._stats: Dict[int, SubtreeStats] = {}
+        self._marker_distance: Dict[int, int] = {}
 
     # ---- helpers ----
     def _clean_text(self, s: str) -> str:
@@ -32,8 +76,11 @@ class ContentExtractor:
     def _words(self, s: str) -> List[str]:
         return re.findall(r"\w+", s, flags=re.UNICODE)
 
+    def _text(self, el) -> str:
+        return self._clean_text(el.get_text(" ", strip=True) or "")
+
     def _get_soup(self, html: str) -> BeautifulSoup:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, "lxml")
         for tag in soup(["script", "style", "noscript", "template"]):
             tag.decompose()
         return soup
@@ -41,38 +88,100 @@ class ContentExtractor:
 
     def _count_keywords(self, s: str) -> int:
         """Count keyword matches where a keyword is a substring of any word in s."""
-        low = s.lower()
-        words = self._words(low)
-        return sum(1 for w in words for kw in self.keywords if kw and kw in w)
+        return self._matcher.count(s)
+
+    def _has_nav_marker(self, node) -> bool:
+        """Check a single node (not its ancestors) for nav/footer indicators."""
+        if not isinstance(node, Tag):
+            return False
+        if (node.name or "").lower() == "footer":
+            return True
+        role = node.get("role") or ""
+        classes = " ".join(node.get("class") or [])
+        id_attr = node.get("id") or ""
+        return _NAV_MARKER_RE.search(f"{role} {classes} {id_attr}") is not None
+
+    def _distance_to_marker(self, el) -> int:
+        """Steps from el up to its nearest marked ancestor-or-self.
+
+        Each node inherits its parent's distance plus one unless it is marked
+        itself; results are cached per document, so classifying every node of
+        a page costs one lookup per node instead of an ancestor walk.
+        """
+        cache = self._marker_distance
+        chain, node = [], el
+        while node is not None and id(node) not in cache:
+            chain.append(node)
+            node = node.parent
+        distance = cache[id(node)] if node is not None else _NO_MARKER
+        for node in reversed(chain):
+            distance = 0 if self._has_nav_marker(node) else min(distance + 1, _NO_MARKER)
+            cache[id(node)] = distance
+        return distance
 
     def _is_nav_or_footer(self, el) -> bool:
         """Check the element and its ancestors for nav/footer indicators."""
-        node, depth = el, 0
-        while node is not None and depth < self._ancestor_check_depth:
-            if isinstance(node, NavigableString):
-                node = getattr(node, "parent", None)
-                depth += 1
-                continue
-
-            tagname = getattr(node, "name", "") or ""
-            if tagname.lower() == "footer":
-                return True
+        return self._distance_to_marker(el) < self._ancestor_check_depth
 
-            role = (node.get("role") or "") if isinstance(node, Tag) else ""
-            classes = " ".join(node.get("class") or []) if isinstance(node, Tag) else ""
-            id_attr = (node.get("id") or "") if isinstance(node, Tag) else ""
-            marker = f"{role} {classes} {id_attr}"
+    def _index_subtrees(self, root):
+        """Compute SubtreeStats for root and every element below it.
 
-            if re.search(
-                r"\b(nav|navigation|footer|header|menu|breadcrumb|cookie|ads|navbar|site-footer|footer-shadow|fixed bottom)\b",
-                marker,
-                flags=re.I,
-            ):
-                return True
+        Children always follow their parent in document order, so walking the
+        descendants backwards visits each element after all of its children.
+        """
+        stats = self._stats
+        nodes = [root, *root.descendants] if isinstance(root, Tag) else []
+        for node in nodes:
+            if isinstance(node, Tag):
+                stats[id(node)] = SubtreeStats(0, 0, 0, 0, self._is_nav_or_footer(node))
+
+        leaves: Dict[int, Tuple[int, int, int, int]] = {}
+        for node in reversed(nodes):
+            if not isinstance(node, Tag):
+                if type(node) in _TEXT_TYPES:
+                    stripped = node.strip()
+                    if stripped:
+                        leaves[id(node)] = (
+                            len(self._words(stripped)),
+                            self._count_keywords(stripped),
+                            len(self._clean_text(stripped)),
+                            1,
+                        )
+                continue
+            words = keywords = chars = parts = 0
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    child_stats = stats[id(child)]
+                else:
+                    child_stats = leaves.get(id(child))
+                    if child_stats is None:
+                        continue
+                words += child_stats[0]
+                keywords += child_stats[1]
+                chars += child_stats[2]
+                parts += child_stats[3]
+            stats[id(node)] = stats[id(node)]._replace(
+                words=words, keywords=keywords, chars=chars, parts=parts
+            )
 
-            node = getattr(node, "parent", None)
-            depth += 1
-        return False
+    def _subtree(self, el: Tag) -> SubtreeStats:
+        """Cached statistics of el, indexing its subtree on first use."""
+        stats = self._stats.get(id(el))
+        if stats is None:
+            self._index_subtrees(el)
+            stats = self._stats[id(el)]
+        return stats
+
+    def _preview(self, el: Tag, limit: int = 200) -> str:
+        """First ``limit`` characters of the element's cleaned text."""
+        parts, size = [], 0
+        for s in el.stripped_strings:
+            part = self._clean_text(s)
+            parts.append(part)
+            size += len(part) + 1
+            if size > limit:
+                break
+        return " ".join(parts)[:limit]
 
     def _score_container(self, el) -> Tuple[float, int, int]:
         """Return (score, keyword_count, word_count) for a container element.
@@ -81,41 +190,53 @@ class ContentExtractor:
         if not isinstance(el, Tag):
             return 0.0, 0, 0
 
-        text = self._clean_text(el.get_text(" ", strip=True) or "")
-        words = self._words(text)
-        word_count = max(1, len(words))
-        keyword_count = self._count_keywords(text)
+        stats = self._subtree(el)
+        word_count = max(1, stats.words)
+        keyword_count = stats.keywords
         score = keyword_count / math.sqrt(word_count)
 
         if word_count >= 50 and keyword_count == 0:
             score = 0.05
 
-        if self._is_nav_or_footer(el):
+        if stats.nav:
             score *= 0.1
         return score, keyword_count, word_count
 
+    def _skip(self, el) -> bool:
+        """Nav/footer check served from the subtree index when available."""
+        if isinstance(el, Tag):
+            return self._subtree(el).nav
+        return self._is_nav_or_footer(el)
+
     # ---- parsing helpers ----
-    def _parse_dl_sections(self, container) -> List[Tuple[Optional[str], str]]:
-        """Return list of (title, text) from dl/dt/dd pairs."""
+    # Sections are (title, text, keyword_count, word_count): keyword_count
+    # covers title and text, word_count only the text.
+    def _parse_dl_sections(self, container) -> List[Tuple[Optional[str], str, int, int]]:
+        """Return list of sections from dl/dt/dd pairs."""
         sections = []
         for dl in container.find_all("dl"):
             for dt in dl.find_all("dt"):
-                title = self._clean_text(dt.get_text(" ", strip=True) or "")
+                title = self._text(dt)
+                keywords, words = self._subtree(dt).keywords, 0
                 dd = dt.find_next_sibling("dd")
                 if dd:
-                    text = self._clean_text(dd.get_text(" ", strip=True) or "")
+                    text = self._text(dd)
+                    keywords += self._subtree(dd).keywords
+                    words += self._subtree(dd).words
                 else:
                     parts, sibling = [], dt.next_sibling
                     while sibling and getattr(sibling, "name", None) != "dt":
-                        if isinstance(sibling, Tag) and sibling.get_text:
-                            parts.append(self._clean_text(sibling.get_text(" ", strip=True)))
+                        if isinstance(sibling, Tag):
+                            parts.append(self._text(sibling))
+                            keywords += self._subtree(sibling).keywords
+                            words += self._subtree(sibling).words
                         sibling = sibling.next_sibling
                     text = " ".join(p for p in parts if p)
                 if title or text:
-                    sections.append((title or None, text))
+                    sections.append((title or None, text, keywords, words))
         return sections
 
-    def _parse_heading_sections(self, container) -> List[Tuple[Optional[str], str]]:
+    def _parse_heading_sections(self, container) -> List[Tuple[Optional[str], str, int, int]]:
         """Split container into sections by headings h1-h3."""
         headings = container.find_all(["h1", "h2", "h3"])
         if not headings:
@@ -123,57 +244,82 @@ class ContentExtractor:
 
         sections = []
         for h in headings:
-            title = self._clean_text(h.get_text(" ", strip=True) or "")
+            title = self._text(h)
+            keywords, words = self._subtree(h).keywords, 0
             parts = []
             for sib in h.next_siblings:
                 if getattr(sib, "name", None) in ("h1", "h2", "h3"):
                     break
-                if isinstance(sib, Tag) and sib.get_text and not self._is_nav_or_footer(sib):
-                    t = self._clean_text(sib.get_text(" ", strip=True) or "")
-                    if t:
-                        parts.append(t)
-            sections.append((title or None, " ".join(parts)))
+                if isinstance(sib, Tag) and not self._skip(sib):
+                    stats = self._subtree(sib)
+                    if stats.parts:
+                        parts.append(self._text(sib))
+                        keywords += stats.keywords
+                        words += stats.words
+            sections.append((title or None, " ".join(parts), keywords, words))
         return sections
 
-    def _collect_paragraphs(self, container) -> List[Tuple[Optional[str], str]]:
+    def _collect_paragraphs(self, container) -> List[Tuple[Optional[str], str, int, int]]:
         """Collect p/li/dd text inside a container."""
-        text = []
+        text, keywords, words = [], 0, 0
         for tag in container.find_all(["p", "li", "dd"]):
-            if self._is_nav_or_footer(tag):
+            if self._skip(tag):
                 continue
-            t = self._clean_text(tag.get_text(" ", strip=True) or "")
-            if t:
-                text.append(t)
-        return [(None, " ".join(text))] if text else []
+            stats = self._subtree(tag)
+            if stats.parts:
+                text.append(self._text(tag))
+                keywords += stats.keywords
+                words += stats.words
+        return [(None, " ".join(text), keywords, words)] if text else []
 
     def _collect_fallback(self, soup) -> List[str]:
         """Fallback: collect p/li/h1..h3 across body but skip nav/footer."""
         texts = []
         for tag in soup.find_all(["p", "li", "h1", "h2", "h3"]):
-            if self._is_nav_or_footer(tag):
+            stats = self._subtree(tag)
+            if stats.nav:
                 continue
-            txt = self._clean_text(tag.get_text(" ", strip=True) or "")
-            if len(txt) >= self.min_line_length and (self._count_keywords(txt) > 0):
-                texts.append(txt)
+            if stats.text_len >= self.min_line_length and stats.keywords > 0:
+                texts.append(self._text(tag))
         return texts
 
     # ---- main pipeline ----
     def _find_candidates(self, soup) -> List[Tag]:
         """Find candidate containers for scoring."""
-        selectors = [
-            "main", "article", "section",
-            "div#content", "div[id*='content']", "div[class*='content']",
-            "div[class*='privacy']", "div[id*='privacy']", "dl", "body",
-            "div[class*='terms']", "div[id*='terms']",
-            "div[class*='policy']", "div[id*='policy']",
-            "div[class*='legal']", "div[id*='legal']",
-        ]
-        candidates = [el for sel in selectors for el in soup.select(sel)]
+        candidates = [el for sel in self.CANDIDATE_SELECTORS for el in soup.select(sel)]
         candidates.extend(soup.find_all("div", recursive=False)[:6])
         return candidates
     
-    def _select_containers(self, candidates: List[Tag]) -> List[Tag]:
-        scored = [(c, *self._score_container(c)) for c in candidates]
+    def _score_candidates(self, candidates: List[Tag]) -> List[Tuple[Tag, float, int, int]]:
+        """Return (container, score, keyword_count, word_count) per candidate."""
+        return [(c, *self._score_container(c)) for c in candidates]
+
+    def _identifying_attrs(self, el: Tag) -> dict:
+        """The id/class/role attributes of el; other attributes only bloat the report."""
+        attrs = {}
+        for key in ("id", "class", "role"):
+            value = el.get(key)
+            if value:
+                attrs[key] = list(value) if isinstance(value, list) else value
+        return attrs
+
+    def _candidate_report(self, scored) -> List[dict]:
+        """Describe every positively scored candidate for storage next to the text."""
+        report = []
+        for c, score, kw, wc in scored:
+            if score > 0:
+                report.append({
+                    "tag": c.name,
+                    "attrs": self._identifying_attrs(c),
+                    "score": round(score, 4),
+                    "keywords": kw,
+                    "words": wc,
+                    "text_preview": self._preview(c),
+                    "text_len": self._subtree(c).text_len
+                })
+        return report
+
+    def _select_containers(self, scored) -> List[Tag]:
         scored = [s for s in scored if s[1] > 0]
         if not scored:
             return []
@@ -185,7 +331,7 @@ class ContentExtractor:
 
         selected = []
         for c, score, _, _ in scored:
-            if c == scored[0][0]:
+            if c is scored[0][0]:
                 selected.append(c)
                 continue
             if score >= high_threshold:
@@ -207,13 +353,8 @@ class ContentExtractor:
         h_secs = self._parse_heading_sections(container) if not dl_secs else []
 
         sections = dl_secs if dl_secs else h_secs
-        for title, text in sections:
-            cond = (
-                (title and self._count_keywords(title) > 0)
-                or (text and self._count_keywords(text) > 0)
-                or (len(self._words(text)) >= self.min_section_words)
-            )
-            if cond:
+        for title, text, keywords, words in sections:
+            if keywords > 0 or words >= self.min_section_words:
                 if title:
                     sections_texts.append(title)
                 if text:
@@ -221,9 +362,9 @@ class ContentExtractor:
 
         if not sections:
             for tag in container.find_all(["p", "li", "dd", "h1", "h2", "h3", "div"]):
-                if self._is_nav_or_footer(tag):
+                if self._skip(tag):
                     continue
-                txt = self._clean_text(tag.get_text(" ", strip=True) or "")
+                txt = self._text(tag)
                 if txt and len(txt.split()) >= 5:
                     sections_texts.append(txt)
 
@@ -239,16 +380,42 @@ class ContentExtractor:
                 final_lines.append(l)
         return final_lines
 
+    def extract(self, html: str) -> Tuple[str, List[dict]]:
+        """Parse html once and return (text blocks, scored-candidates report)."""
+        soup = self._get_soup(html)
+        self._stats, self._marker_distance = {}, {}
+        try:
+            self._index_subtrees(soup)
+            scored = self._score_candidates(self._find_candidates(soup))
+            selected = self._select_containers(scored)
+
+            sections_texts = []
+            for container in selected:
+                sections_texts.extend(self._extract_from_container(container))
+
+            sections_texts.extend(self._collect_fallback(soup))
+
+            text = "\n\n".join(self._deduplicate(sections_texts))
+            return text, self._candidate_report(scored)
+        finally:
+            # Keys are object ids, so they must not outlive this document.
+            self._stats, self._marker_distance = {}, {}
+
     def extract_blocks(self, html: str) -> str:
         """Extract relevant text blocks and filter by keyword substrings."""
-        soup = BeautifulSoup(html, "html.parser")
-        candidates = self._find_candidates(soup)
-        selected = self._select_containers(candidates)
+        return self.extract(html)[0]
 
-        sections_texts = []
-        for container in selected:
-            sections_texts.extend(self._extract_from_container(container))
 
-        sections_texts.extend(self._collect_fallback(soup))
+# ---- process pool workers ----
+_worker_extractor: Optional[ContentExtractor] = None
+
+
+def init_extraction_worker(keywords: List[str], min_line_length: int):
+    """ProcessPoolExecutor initializer: build the worker's extractor once."""
+    global _worker_extractor
+    _worker_extractor = ContentExtractor(keywords, min_line_length)
+
 
-        return "\n\n".join(self._deduplicate(sections_texts))
+def extract_in_worker(html: str) -> Tuple[str, List[dict]]:
+    """Run ContentExtractor.extract inside a pool worker."""
+    return _worker_extractor.extract(html)
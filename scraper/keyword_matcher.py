@@ -0,0 +1,89 @@
+import re
+import unicodedata
+from collections import Counter, deque
+from typing import Dict, List, Set
+
+# Arabic letters that Persian pages use interchangeably with the Persian ones,
+# plus characters that must not split or alter a word (ZWNJ, ZWJ, tatweel,
+# harakat). Presentation forms are folded by NFKC before this table applies.
+_PERSIAN_FOLD = {ord("ي"): "ی", ord("ى"): "ی", ord("ك"): "ک"}
+_PERSIAN_FOLD.update({cp: None for cp in (0x200C, 0x200D, 0x0640, 0x0670)})
+_PERSIAN_FOLD.update({cp: None for cp in range(0x064B, 0x0660)})
+
+_WORD_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+
+class KeywordMatcher:
+    """Counts keyword hits with a precompiled Aho-Corasick automaton.
+
+    A hit is a (word, keyword) pair where the keyword is a substring of the
+    word, so results agree with a naive ``kw in word`` loop. Each distinct word
+    is scanned once and its hit count cached, making ``count`` linear in the
+    text and independent of the number of keywords.
+    """
+
+    def __init__(self, keywords: List[str], cache_size: int = 200_000):
+        self.keywords = list(dict.fromkeys(
+            k for k in (self.normalize(kw) for kw in keywords) if k
+        ))
+        self._cache_size = cache_size
+        self._cache: Dict[str, int] = {}
+        self._build()
+
+    @staticmethod
+    def normalize(s: str) -> str:
+        """Fold case, Arabic/Persian letter variants and joiners."""
+        return unicodedata.normalize("NFKC", s).lower().translate(_PERSIAN_FOLD)
+
+    def _build(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Set[int]] = [set()]
+        for idx, kw in enumerate(self.keywords):
+            node = 0
+            for ch in kw:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    self._goto.append({})
+                    self._out.append(set())
+                    nxt = self._goto[node][ch] = len(self._goto) - 1
+                node = nxt
+            self._out[node].add(idx)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def _scan(self, word: str) -> int:
+        """Number of distinct keywords occurring in word."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Set[int] = set()
+        node = 0
+        for ch in word:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return len(found)
+
+    def word_hits(self, word: str) -> int:
+        """Cached hit count for an already normalized word."""
+        hits = self._cache.get(word)
+        if hits is None:
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            hits = self._cache[word] = self._scan(word)
+        return hits
+
+    def count(self, text: str) -> int:
+        """Total keyword hits over all words of text."""
+        words = Counter(_WORD_RE.findall(self.normalize(text)))
+        return sum(n * self.word_hits(w) for w, n in words.items())
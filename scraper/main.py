@@ -7,13 +7,65 @@ proj_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if proj_root not in sys.path:
     sys.path.insert(0, proj_root)
 
+from scraper.scheduler import Checkpoint
 from scraper.scraper_core import Scraper
 
 def main():
     parser = argparse.ArgumentParser(description="Privacy Policy Scraper")
-    parser.add_argument("--input", type=str, default="urls.txt", help="File with URLs")
+    parser.add_argument("--input", type=str, default="urls.txt", help="File with URLs ('-' reads stdin)")
+    parser.add_argument(
+        "--checkpoint", type=str, default=None,
+        help="Progress file; an existing one resumes the run where it stopped"
+    )
     parser.add_argument("--out", type=str, default="result", help="Output directory")
     parser.add_argument("--parallel", type=int, default=3, help="Concurrent browsers")
+    parser.add_argument(
+        "--concurrency", type=int, default=50, help="Concurrent URLs on the HTTP fast path"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=20.0, help="HTTP read timeout in seconds"
+    )
+    parser.add_argument(
+        "--connect-timeout", type=float, default=10.0, help="HTTP connect timeout in seconds"
+    )
+    parser.add_argument(
+        "--max-connections", type=int, default=100, help="Size of the shared HTTP connection pool"
+    )
+    parser.add_argument(
+        "--per-domain", type=int, default=2,
+        help="Maximum concurrent requests per registrable domain"
+    )
+    parser.add_argument(
+        "--domain-rate", type=float, default=2.0,
+        help="Requests per second allowed per registrable domain (0 disables)"
+    )
+    parser.add_argument(
+        "--recycle-pages", type=int, default=50, help="Restart a pooled browser after this many pages"
+    )
+    parser.add_argument(
+        "--recycle-memory-mb", type=int, default=1024,
+        help="Restart a pooled browser once its processes use more memory than this (0 disables)"
+    )
+    parser.add_argument(
+        "--text-only", action="store_true",
+        help="Block images, fonts, media and trackers in Playwright and stop once content settles"
+    )
+    parser.add_argument(
+        "--extract-workers", type=int, default=os.cpu_count() or 1,
+        help="Processes used for HTML parsing and extraction (0 extracts on the event loop)"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Re-check stored URLs with conditional requests and update only changed pages"
+    )
+    parser.add_argument(
+        "--blob-dir", type=str, default=None,
+        help="Store compressed raw HTML in this directory instead of MongoDB GridFS"
+    )
+    parser.add_argument(
+        "--write-batch", type=int, default=200,
+        help="Documents buffered per bulk write to MongoDB"
+    )
     parser.add_argument(
         "--min-length", type=int, default=50, help="Minimum characters per block"
     )
@@ -21,14 +73,35 @@ def main():
 
     args = parser.parse_args()
 
+    scraper = Scraper(
+        args.min_length,
+        timeout=args.timeout,
+        connect_timeout=args.connect_timeout,
+        max_connections=args.max_connections,
+        per_domain_connections=args.per_domain,
+        domain_rate=args.domain_rate,
+        recycle_pages=args.recycle_pages,
+        recycle_memory_mb=args.recycle_memory_mb,
+        text_only=args.text_only,
+        extract_workers=args.extract_workers,
+        refresh=args.refresh,
+        blob_dir=args.blob_dir,
+        write_batch_size=args.write_batch,
+    )
+
     if args.debug:
-        urls = ["https://www.filimo.com/asparagus/term"]
+        urls, source = ["https://www.filimo.com/asparagus/term"], "debug"
+    elif args.input == "-":
+        urls, source = sys.stdin, "stdin"
     else:
-        with open(args.input, "r", encoding="utf-8") as f:
-            urls = f.readlines()
+        urls, source = open(args.input, "r", encoding="utf-8"), os.path.abspath(args.input)
 
-    scraper = Scraper(args.min_length)
-    asyncio.run(scraper.scrape_all(urls, args.parallel))
+    checkpoint = Checkpoint(args.checkpoint, source) if args.checkpoint else None
+    try:
+        asyncio.run(scraper.scrape_all(urls, args.parallel, args.concurrency, checkpoint))
+    finally:
+        if urls is not sys.stdin and hasattr(urls, "close"):
+            urls.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+from itertools import islice
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class Checkpoint:
+    """Low-watermark progress file for a URL list.
+
+    ``position`` is the number of input lines that are fully processed: every
+    line before it is done, so a resumed run can start there. Lines finished
+    out of order are held until the gap below them closes.
+    """
+
+    def __init__(self, path: str, source: str, save_every: int = 100):
+        self.path = path
+        self.source = source
+        self.save_every = save_every
+        self.position = 0
+        self._done: Set[int] = set()
+        self._unsaved = 0
+
+    def load(self) -> int:
+        """Read the saved position, ignoring checkpoints of another input."""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("source") != self.source:
+            print(f"[WARN] checkpoint {self.path} belongs to {data.get('source')}, starting over")
+            return 0
+        self.position = int(data.get("position", 0))
+        return self.position
+
+    def mark_done(self, line_no: int) -> bool:
+        """Record a finished line; returns True when a save is due."""
+        self._done.add(line_no)
+        while self.position in self._done:
+            self._done.remove(self.position)
+            self.position += 1
+            self._unsaved += 1
+        return self._unsaved >= self.save_every
+
+    def save(self, position: Optional[int] = None):
+        """Atomically write the current (or a given earlier) position."""
+        position = self.position if position is None else position
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "position": position}, f)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+
+class UrlScheduler:
+    """Streams URLs through a bounded queue to a fixed set of async workers.
+
+    Lines are read lazily in small batches off the event loop, so memory stays
+    constant no matter how long the input is. ``skip`` is awaited once per batch
+    with its URLs and returns those that need no work (e.g. already stored),
+    so such checks cost one round-trip per batch instead of one per URL.
+    ``before_save`` is awaited before each checkpoint save, so results that
+    are still buffered get written before their lines count as done.
+    """
+
+    def __init__(self, lines: Iterable[str], workers: int, queue_size: Optional[int] = None,
+                 checkpoint: Optional[Checkpoint] = None, batch_size: int = 256,
+                 skip: Optional[Callable[[List[str]], Awaitable[Set[str]]]] = None,
+                 before_save: Optional[Callable[[], Awaitable[None]]] = None):
+        self.lines = lines
+        self.workers = max(1, workers)
+        self.queue_size = queue_size or self.workers * 2
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.skip = skip
+        self.before_save = before_save
+
+    async def _next_batch(self, numbered: Iterator[Tuple[int, str]]) -> Tuple[List[Tuple[int, str]], Set[str]]:
+        batch = await asyncio.to_thread(list, islice(numbered, self.batch_size))
+        urls = [url for _, url in batch if url]
+        skipped = await self.skip(urls) if self.skip and urls else set()
+        return batch, skipped
+
+    def _numbered(self, start: int) -> Iterator[Tuple[int, str]]:
+        for line_no, line in enumerate(self.lines):
+            if line_no >= start:
+                yield line_no, line.strip()
+
+    async def _save_checkpoint(self):
+        position = self.checkpoint.position
+        if self.before_save:
+            await self.before_save()
+        self.checkpoint.save(position)
+
+    async def _mark_done(self, line_no: int):
+        if self.checkpoint and self.checkpoint.mark_done(line_no):
+            await self._save_checkpoint()
+
+    async def run(self, handler: Callable[[str], Awaitable[None]]):
+        """Call handler for every non-empty URL, ``workers`` at a time."""
+        start = self.checkpoint.load() if self.checkpoint else 0
+        if start:
+            print(f"[RESUME] skipping {start} already processed lines")
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        numbered = self._numbered(start)
+
+        async def produce():
+            while True:
+                batch, skipped = await self._next_batch(numbered)
+                if not batch:
+                    break
+                for line_no, url in batch:
+                    if url in skipped:
+                        print(f"[SKIP] {url} already scraped")
+                        await self._mark_done(line_no)
+                        continue
+                    await queue.put((line_no, url))
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                line_no, url = item
+                try:
+                    if url:
+                        await handler(url)
+                except Exception as e:
+                    print(f"[FAIL] {url} ({type(e).__name__}: {e})")
+                # Interrupted or cancelled lines stay pending for the next run.
+                await self._mark_done(line_no)
+
+        try:
+            await asyncio.gather(produce(), *(consume() for _ in range(self.workers)))
+        finally:
+            if self.checkpoint:
+                await self._save_checkpoint()
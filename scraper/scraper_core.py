@@ -6,120 +6,352 @@ if proj_root not in sys.path:
     sys.path.insert(0, proj_root)
 
 import asyncio
-import requests
+import hashlib
+import multiprocessing
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from urllib.parse import urlparse
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Set, Tuple, Optional
 
 from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-from scraper.content_extractor import ContentExtractor
+from scraper.browser_pool import BrowserPool
+from scraper.content_extractor import (
+    ContentExtractor, extract_in_worker, init_extraction_worker,
+)
+from scraper.scheduler import Checkpoint, UrlScheduler
 from .keywords import KEYWORDS
-from utils.mongo_driver import MongoDriver
+from utils.blob_store import open_blob_store
+from utils.async_mongo_driver import AsyncMongoDriver, close_async_clients
+from utils.mongo_driver import AsyncBufferedWriter, MongoDriver
+from utils.politeness import DomainRateLimiter
+
+# Resource types aborted in text-only mode; none of them carry policy text.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# Analytics/ad hosts whose scripts are aborted in text-only mode.
+TRACKER_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "facebook.net", "hotjar.com", "clarity.ms",
+    "mc.yandex.ru", "yektanet.com", "najva.com", "mediaad.org", "tapsell.ir",
+)
+
+# Records the time of the latest DOM mutation so the wait below can tell
+# when the page has stopped changing.
+MUTATION_TRACKER_JS = """
+window.__ppmLastMutation = performance.now();
+new MutationObserver(() => { window.__ppmLastMutation = performance.now(); })
+    .observe(document, {childList: true, subtree: true, characterData: true});
+"""
+
+# True once a candidate privacy container exists and the DOM has been quiet.
+CONTENT_READY_JS = """
+([selectors, quietMs]) => {
+    if (!selectors.some((sel) => document.querySelector(sel))) return false;
+    return performance.now() - (window.__ppmLastMutation || 0) >= quietMs;
+}
+"""
 
 
 class Scraper:
     """Main scraper class handling both requests + Playwright, with MongoDB saving."""
 
     def __init__(self, min_line_length: int = 50,
-                 db_name: str = "privacy_monitor"):
+                 db_name: str = "privacy_monitor",
+                 timeout: float = 20.0,
+                 connect_timeout: float = 10.0,
+                 max_connections: int = 100,
+                 per_domain_connections: int = 2,
+                 domain_rate: float = 2.0,
+                 recycle_pages: int = 50,
+                 recycle_memory_mb: int = 1024,
+                 text_only: bool = False,
+                 extract_workers: int = 0,
+                 refresh: bool = False,
+                 blob_dir: Optional[str] = None,
+                 write_batch_size: int = 200):
         self.extractor = ContentExtractor(KEYWORDS, min_line_length)
-        self.mongo = MongoDriver(db_name=db_name, collection="scraped_pages")
+        self.mongo = AsyncMongoDriver(db_name=db_name, collection="scraped_pages")
+        # GridFS blobs go through the synchronous client in a worker thread.
+        self.blobs = open_blob_store(None if blob_dir else MongoDriver(db_name=db_name).db, blob_dir)
+        self.write_batch_size = write_batch_size
+        self.writer: Optional[AsyncBufferedWriter] = None
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.http: Optional[httpx.AsyncClient] = None
+        self.limiter = DomainRateLimiter(
+            rate=domain_rate, burst=max(1, per_domain_connections),
+            max_concurrent=per_domain_connections,
+        )
+        self.recycle_pages = recycle_pages
+        self.recycle_memory_mb = recycle_memory_mb
+        self.text_only = text_only
+        self.extract_workers = extract_workers
+        self.refresh = refresh
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # "body" always matches, so it says nothing about the content being ready.
+        self._ready_selectors = [
+            sel for sel in ContentExtractor.CANDIDATE_SELECTORS if sel != "body"
+        ]
 
     def _get_root_url(self, url: str) -> str:
         """Return scheme://hostname part of URL."""
         parsed = urlparse(url)
         return f"{parsed.scheme}://{parsed.netloc}"
 
-    def scrape_with_requests(self, url: str) -> Tuple[Optional[str], Optional[str]]:
-        """Scrape page using requests (fast path)."""
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the shared keep-alive HTTP/2 client used by the fast path."""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+            keepalive_expiry=30.0,
+        )
+        return httpx.AsyncClient(
+            http2=True,
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+        )
+
+    async def scrape_with_requests(self, url: str,
+                                   previous: Optional[dict] = None) -> Tuple[Optional[str], dict]:
+        """Fetch page HTML using the pooled async HTTP client (fast path).
+
+        Returns (html, meta). With a previously stored document the request is
+        conditional; a 304 answer gives (None, {"not_modified": True}).
+        """
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
         try:
-            resp = requests.get(url, timeout=20)
+            async with self.limiter.limit(url):
+                resp = await self.http.get(url, headers=headers)
+            if resp.status_code == 304:
+                return None, {"not_modified": True}
             resp.raise_for_status()
-            html = resp.text
-            text = self.extractor.extract_blocks(html)
-            return html, text
+            return resp.text, {
+                "etag": resp.headers.get("etag"),
+                "last_modified": resp.headers.get("last-modified"),
+            }
         except Exception as e:
             print(f"[FAIL][requests] {url} ({type(e).__name__}: {e})")
-            return None, None
+            return None, {}
+
+    def _is_tracker(self, url: str) -> bool:
+        host = urlparse(url).hostname or ""
+        return any(host == t or host.endswith("." + t) for t in TRACKER_HOSTS)
 
-    async def scrape_with_playwright(self, url: str, pw):
-        """Scrape page using Playwright (fallback path)."""
-        browser = await pw.chromium.launch(headless=True)
-        page = await browser.new_page()
+    async def _block_heavy_resources(self, route):
+        """Route handler aborting media, fonts and tracker requests."""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or self._is_tracker(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _load_text_only(self, context, url: str):
+        """Open URL without heavy resources and return once its content has settled."""
+        await context.route("**/*", self._block_heavy_resources)
+        await context.add_init_script(MUTATION_TRACKER_JS)
+        page = await context.new_page()
+        await page.goto(url, timeout=30000, wait_until="domcontentloaded")
         try:
-            await page.goto(url, timeout=60000, wait_until="networkidle")
-            await page.wait_for_timeout(3000)
+            await page.wait_for_function(
+                CONTENT_READY_JS, arg=[self._ready_selectors, 500],
+                timeout=10000, polling=250,
+            )
+        except PlaywrightTimeoutError:
+            # Pages without any known container are still worth extracting.
+            pass
+        return page
 
-            html = await page.content()
-            text = self.extractor.extract_blocks(html)
-            return html, text
+    async def _load_full(self, context, url: str):
+        """Open URL with every resource and wait for the network to go idle."""
+        page = await context.new_page()
+        await page.goto(url, timeout=60000, wait_until="networkidle")
+        await page.wait_for_timeout(3000)
+        return page
+
+    async def scrape_with_playwright(self, url: str, pool: BrowserPool) -> Optional[str]:
+        """Fetch page HTML using Playwright in a fresh pooled context (fallback path)."""
+        try:
+            async with self.limiter.limit(url), pool.context() as context:
+                if self.text_only:
+                    page = await self._load_text_only(context, url)
+                else:
+                    page = await self._load_full(context, url)
+                return await page.content()
         except Exception as e:
             print(f"[FAIL][playwright] {url} ({type(e).__name__}: {e})")
-            return None, None
-        finally:
-            await browser.close()
-
-    def _score_candidates(self, html: str):
-        """Extract and score candidate containers from HTML, with more details."""
-        soup = self.extractor._get_soup(html)
-        candidates = self.extractor._find_candidates(soup)
-
-        results = []
-        for c in candidates:
-            score, kw, wc = self.extractor._score_container(c)
-            if score > 0:
-                raw_text = self.extractor._clean_text(c.get_text(" ", strip=True) or "")
-                results.append({
-                    "tag": c.name,
-                    "attrs": dict(c.attrs),
-                    "score": round(score, 4),
-                    "keywords": kw,
-                    "words": wc,
-                    "text_preview": raw_text[:200],
-                    "text_len": len(raw_text)
-                })
-        return results
+            return None
+
+    def _build_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Create the extraction process pool, or None to extract inline."""
+        if self.extract_workers <= 0:
+            return None
+        # spawn: forking a process that already runs pymongo/asyncio threads is unsafe.
+        return ProcessPoolExecutor(
+            max_workers=self.extract_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_extraction_worker,
+            initargs=(KEYWORDS, self.extractor.min_line_length),
+        )
 
+    async def _extract(self, html: Optional[str], url: str) -> Tuple[str, List[dict]]:
+        """Return (text, scored candidates) for html, parsed a single time.
 
-    async def process_url(self, url: str, pw):
-        """Process a single URL with requests first, then Playwright fallback. Save to MongoDB."""
-        if self.mongo.already_scraped(url):
+        Runs in the extraction process pool when one is configured, so heavy
+        pages never block the event loop. A pool broken by a dead worker (e.g.
+        OOM-killed) is replaced and the page tried once more on the new one.
+        """
+        if not html:
+            return "", []
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                if executor is None:
+                    return self.extractor.extract(html)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, extract_in_worker, html)
+            except BrokenProcessPool as e:
+                print(f"[WARN][extract] {url} worker pool broke ({e}); restarting it")
+                # Concurrent pages see the same broken pool; only the first replaces it.
+                if self._executor is executor:
+                    executor.shutdown(wait=False)
+                    self._executor = self._build_executor()
+            except Exception as e:
+                print(f"[FAIL][extract] {url} ({type(e).__name__}: {e})")
+                return "", []
+        print(f"[FAIL][extract] {url} (worker pool broke twice)")
+        return "", []
+
+    def _hash(self, content: str) -> str:
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def _mark_unchanged(self, url: str, fields: Optional[dict] = None):
+        await self.writer.update_fields(url, {**(fields or {}), "checked_at": datetime.utcnow()})
+        print(f"[UNCHANGED] {url}")
+
+    async def _ensure_indexes(self):
+        await self.mongo.ensure_index("url", unique=True)
+        await self.mongo.ensure_index("site_url")
+
+    async def _already_scraped(self, urls: List[str]) -> Set[str]:
+        """Bulk existence check used by the scheduler for each batch of URLs."""
+        return await self.mongo.existing_values("url", urls)
+
+    async def _page_doc(self, url: str, html: str, text: str, scored_containers: List[dict],
+                        method: str, meta: Optional[dict] = None) -> dict:
+        """Build the scraped_pages document of a page and store its raw HTML."""
+        meta = meta or {}
+        now = datetime.utcnow()
+        content_hash = self._hash(html)
+        doc = {
+            "url": url,
+            "site_url": self._get_root_url(url),
+            "text": text,
+            "method": method,
+            "scores": scored_containers,
+            "etag": meta.get("etag"),
+            "last_modified": meta.get("last_modified"),
+            "content_hash": content_hash,
+            "text_hash": self._hash(text),
+            "saved_at": now,
+            "checked_at": now,
+        }
+        # Raw HTML lives compressed in the blob store, deduplicated by hash.
+        doc["html_ref"] = await asyncio.to_thread(self.blobs.put, content_hash, html)
+        return doc
+
+    async def process_url(self, url: str, pool: BrowserPool, checked: bool = False):
+        """Process a single URL with requests first, then Playwright fallback. Save to MongoDB.
+
+        Writes go through ``self.writer``, which ``scrape_all`` sets up.
+        ``checked`` means the caller already knows the URL is not stored yet.
+        In refresh mode a stored URL is fetched conditionally; a 304 or an
+        identical content hash skips extraction and leaves the stored text (and
+        therefore every downstream stage) untouched.
+        """
+        previous = None
+        if self.refresh:
+            previous = await self.mongo.find_by_url(
+                url, ["etag", "last_modified", "content_hash", "text_hash"]
+            )
+        elif not checked and await self.mongo.already_scraped(url):
             print(f"[SKIP] {url} already scraped")
             return
 
         method = "requests"
-        html, text = self.scrape_with_requests(url)
+        html, meta = await self.scrape_with_requests(url, previous)
+        if meta.get("not_modified"):
+            await self._mark_unchanged(url)
+            return
+        if previous and html and self._hash(html) == previous.get("content_hash"):
+            await self._mark_unchanged(url, meta)
+            return
+        text, scored_containers = await self._extract(html, url)
 
-        if not html or not text:
-            method = "playwright"
-            html, text = await self.scrape_with_playwright(url, pw)
+        if not text:
+            method, meta = "playwright", {}
+            html = await self.scrape_with_playwright(url, pool)
+            if previous and html and self._hash(html) == previous.get("content_hash"):
+                await self._mark_unchanged(url)
+                return
+            text, scored_containers = await self._extract(html, url)
 
         if html and text:
-            scored_containers = self._score_candidates(html)
-            doc = {
-                "url": url,
-                "site_url": self._get_root_url(url),
-                "html": html,
-                "text": text,
-                "method": method,
-                "scores": scored_containers,
-                "saved_at": datetime.utcnow()
-            }
-            self.mongo.insert_doc(doc)
-            print(f"[OK] {url} → saved to database ({method})")
+            doc = await self._page_doc(url, html, text, scored_containers, method, meta)
+            if previous is None:
+                await self.writer.insert_doc(doc)
+                print(f"[OK] {url} → saved to database ({method})")
+            elif doc["text_hash"] == previous.get("text_hash"):
+                # Markup changed but the extracted text did not: keep downstream results.
+                await self._mark_unchanged(url, {
+                    "etag": doc["etag"], "last_modified": doc["last_modified"],
+                    "content_hash": doc["content_hash"],
+                })
+            else:
+                await self.writer.replace_doc(doc)
+                print(f"[UPDATED] {url} → content changed ({method})")
         else:
             print(f"[FAIL] Could not scrape {url}")
 
-    async def scrape_all(self, urls, parallel: int):
-        """Scrape all URLs in parallel with Playwright."""
-        sem = asyncio.Semaphore(parallel)
+    async def scrape_all(self, urls: Iterable[str], parallel: int, concurrency: int = 50,
+                         checkpoint: Optional[Checkpoint] = None):
+        """Scrape all URLs concurrently.
 
-        async with async_playwright() as pw:
+        ``urls`` is consumed lazily (a file object or stdin works), and
+        ``concurrency`` workers pull from a bounded queue, which bounds the URLs
+        in flight on the HTTP fast path. ``parallel`` is the size of the browser
+        pool used by the Playwright fallback.
+        """
+        await self._ensure_indexes()
+        self._executor = self._build_executor()
 
-            async def bound_process(u):
-                async with sem:
-                    await self.process_url(u.strip(), pw)
-
-            tasks = [bound_process(u) for u in urls if u.strip()]
-            await asyncio.gather(*tasks)
+        try:
+            async with self.mongo.buffered_async(self.write_batch_size) as writer:
+                self.writer = writer
+                scheduler = UrlScheduler(
+                    urls, workers=max(concurrency, parallel), checkpoint=checkpoint,
+                    skip=None if self.refresh else self._already_scraped,
+                    before_save=writer.flush,
+                )
+                async with async_playwright() as pw, self._build_http_client() as http:
+                    self.http = http
+                    async with BrowserPool(pw, size=parallel, max_pages=self.recycle_pages,
+                                           max_memory_mb=self.recycle_memory_mb) as pool:
+                        await scheduler.run(
+                            lambda url: self.process_url(url, pool, checked=not self.refresh)
+                        )
+        finally:
+            self.writer = None
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            await close_async_clients()
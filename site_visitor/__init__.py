@@ -0,0 +1 @@
+"""site_visitor package init."""
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import contextlib
+import sys
+import os
+
+proj_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+from crawler.consent import load_consent_patterns
+from crawler.result_writer import open_result_writer
+from scraper.scheduler import Checkpoint
+from site_visitor.visitor import SiteVisitor
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Collect cookies and scrape privacy policies in a single browser visit per site"
+    )
+    parser.add_argument("--input", type=str, default="urls.txt", help="File with policy URLs ('-' reads stdin)")
+    parser.add_argument(
+        "--checkpoint", type=str, default=None,
+        help="Progress file; an existing one resumes the run where it stopped"
+    )
+    parser.add_argument("--parallel", type=int, default=3, help="Concurrent browsers (and sites in flight)")
+    parser.add_argument(
+        "--output", type=str, default=None,
+        help="Also append cookies to this file as sites finish (.parquet for Parquet, CSV otherwise)"
+    )
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="Cookie output format (default: from the --output extension)")
+    parser.add_argument("--consent-config", type=str, default=None,
+                        help="JSON file with cookie consent patterns (default: crawler/consent_patterns.json)")
+    parser.add_argument("--consent-timeout", type=float, default=3.0,
+                        help="Seconds to wait for a cookie consent banner to appear")
+    parser.add_argument("--max-scrolls", type=int, default=3, help="Homepage scrolls before the policy page")
+    parser.add_argument(
+        "--per-domain", type=int, default=1,
+        help="Maximum concurrent visits per registrable domain"
+    )
+    parser.add_argument(
+        "--domain-rate", type=float, default=0.1,
+        help="Visits per second allowed per registrable domain (0 disables)"
+    )
+    parser.add_argument(
+        "--recycle-pages", type=int, default=50, help="Restart a pooled browser after this many sites"
+    )
+    parser.add_argument(
+        "--recycle-memory-mb", type=int, default=1024,
+        help="Restart a pooled browser once its processes use more memory than this (0 disables)"
+    )
+    parser.add_argument(
+        "--extract-workers", type=int, default=os.cpu_count() or 1,
+        help="Processes used for HTML parsing and extraction (0 extracts on the event loop)"
+    )
+    parser.add_argument(
+        "--blob-dir", type=str, default=None,
+        help="Store compressed raw HTML in this directory instead of MongoDB GridFS"
+    )
+    parser.add_argument(
+        "--write-batch", type=int, default=200,
+        help="Documents buffered per bulk write to MongoDB"
+    )
+    parser.add_argument(
+        "--min-length", type=int, default=50, help="Minimum characters per block"
+    )
+    parser.add_argument("--debug", action="store_true", help="Debug with sample URL")
+
+    args = parser.parse_args()
+
+    visitor = SiteVisitor(
+        consent_patterns=load_consent_patterns(args.consent_config),
+        consent_timeout=args.consent_timeout,
+        max_scrolls=args.max_scrolls,
+        min_line_length=args.min_length,
+        per_domain_connections=args.per_domain,
+        domain_rate=args.domain_rate,
+        recycle_pages=args.recycle_pages,
+        recycle_memory_mb=args.recycle_memory_mb,
+        extract_workers=args.extract_workers,
+        blob_dir=args.blob_dir,
+        write_batch_size=args.write_batch,
+    )
+
+    if args.debug:
+        urls, source = ["https://www.filimo.com/asparagus/term"], "debug"
+    elif args.input == "-":
+        urls, source = sys.stdin, "stdin"
+    else:
+        urls, source = open(args.input, "r", encoding="utf-8"), os.path.abspath(args.input)
+
+    checkpoint = Checkpoint(args.checkpoint, source) if args.checkpoint else None
+    try:
+        with (open_result_writer(args.output, args.format) if args.output
+              else contextlib.nullcontext()) as writer:
+            asyncio.run(visitor.visit_all(urls, args.parallel, checkpoint, writer))
+    finally:
+        if urls is not sys.stdin and hasattr(urls, "close"):
+            urls.close()
+
+
+if __name__ == "__main__":
+    main()
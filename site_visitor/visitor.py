@@ -0,0 +1,302 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from crawler.consent import CONSENT_JS, load_consent_patterns
+from crawler.cookie_capture import CookieCapture
+from crawler.interaction import FastProfile
+from scraper.browser_pool import BrowserPool
+from scraper.scheduler import Checkpoint, UrlScheduler
+from scraper.scraper_core import CONTENT_READY_JS, MUTATION_TRACKER_JS, Scraper
+from utils.async_mongo_driver import AsyncMongoDriver, close_async_clients
+from utils.mongo_driver import AsyncBufferedWriter
+
+
+class CdpNetworkEvents:
+    """DevTools network events of one Playwright page, for ``CookieCapture``.
+
+    Plays the part of the crawler's ``NetworkMonitor``: events are pushed by
+    the page's CDP session instead of read from a log, so ``poll`` has nothing
+    to do. ``idle`` counts requests in flight the same way.
+    """
+
+    METHODS = (
+        "Network.requestWillBeSent", "Network.responseReceivedExtraInfo",
+        "Network.loadingFinished", "Network.loadingFailed",
+    )
+
+    def __init__(self, session, max_inflight: int = 2, stale_after: float = 10.0):
+        self.session = session
+        self.max_inflight = max_inflight
+        self.stale_after = stale_after
+        self.listeners: List[Callable[[str, dict], None]] = []
+        self._inflight: Dict[str, float] = {}
+        self.last_activity = time.monotonic()
+        for method in self.METHODS:
+            session.on(method, lambda params, method=method: self._dispatch(method, params))
+
+    async def start(self):
+        await self.session.send("Network.enable")
+
+    def _dispatch(self, method: str, params: dict):
+        now = self.last_activity = time.monotonic()
+        if method == "Network.requestWillBeSent":
+            self._inflight[params.get("requestId")] = now
+        elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+            self._inflight.pop(params.get("requestId"), None)
+        for listener in self.listeners:
+            listener(method, params)
+
+    def poll(self) -> int:
+        return 0
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        pending = sum(1 for started in self._inflight.values() if now - started < self.stale_after)
+        return pending <= self.max_inflight
+
+
+class SiteVisitor(Scraper):
+    """Collects a site's cookies and its policy text in one browser session.
+
+    For each policy URL, one pooled Playwright context:
+    - opens the site's homepage and clicks the cookie banner (``CONSENT_JS``)
+    - scrolls the homepage, then follows the policy URL in the same context
+      and extracts its text with ``ContentExtractor``
+    - reads every cookie of the session, from DevTools ``Set-Cookie`` events
+      and the context's jar (``CookieCapture``)
+
+    Both the ``crawled_cookies`` and the ``scraped_pages`` documents are
+    written from that single visit, so a site is no longer loaded once by the
+    Selenium crawler and again by the Playwright scraper. Waits follow the
+    crawler's fast profile: each step ends once the network is idle and the
+    page stopped changing.
+    """
+
+    def __init__(self, db_name: str = "privacy_monitor", consent_patterns: Optional[dict] = None,
+                 consent_timeout: float = 3.0, max_scrolls: int = 3, **scraper_options):
+        super().__init__(db_name=db_name, **scraper_options)
+        self.cookie_store = AsyncMongoDriver(db_name=db_name, collection="crawled_cookies")
+        self.consent_patterns = consent_patterns or load_consent_patterns()
+        self.consent_timeout = consent_timeout
+        self.max_scrolls = max_scrolls
+        self.cookie_writer: Optional[AsyncBufferedWriter] = None
+        self.result_writer = None
+        # Roots whose cookies are stored or being collected by this run.
+        self._cookie_roots: Set[str] = set()
+        # Stored pages of looked-up URLs that still need a visit for their cookies.
+        self._stored_pages: Set[str] = set()
+
+    async def _ensure_indexes(self):
+        await super()._ensure_indexes()
+        await self.cookie_store.ensure_index("url", unique=True)
+
+    async def _already_visited(self, urls: List[str]) -> Set[str]:
+        """URLs whose page and whose site's cookies are both stored, in two bulk queries."""
+        pages = await self.mongo.existing_values("url", urls)
+        roots = await self.cookie_store.existing_values("url", (self._get_root_url(u) for u in urls))
+        self._cookie_roots |= roots
+        done = {url for url in urls if url in pages and self._get_root_url(url) in roots}
+        self._stored_pages |= pages - done
+        return done
+
+    async def _wait_stable(self, step: str, events: CdpNetworkEvents,
+                           probe: Callable[[], Awaitable[object]]) -> object:
+        """Wait until the network is idle and ``probe()`` stopped changing (see ``FastProfile``)."""
+        quiet, timeout = FastProfile.WAITS[step]
+        start = last_change = time.monotonic()
+        value = await probe()
+        while True:
+            await asyncio.sleep(0.1)
+            now = time.monotonic()
+            current = await probe()
+            if current != value:
+                value, last_change = current, now
+            if events.idle() and now - max(last_change, events.last_activity) >= quiet:
+                return value
+            if now - start >= timeout:
+                return value
+
+    async def _jar(self, context, session) -> List[dict]:
+        """Every cookie of the context in DevTools format."""
+        try:
+            return (await session.send("Network.getAllCookies")).get("cookies", [])
+        except Exception:
+            return [
+                {**c, "session": c.get("expires", -1) < 0}
+                for c in await context.cookies()
+            ]
+
+    async def _jar_snapshot(self, context, session) -> frozenset:
+        """The context's cookies as a comparable set (see ``crawler.interaction.cookie_snapshot``)."""
+        return frozenset(
+            (c.get("name"), c.get("domain"), c.get("path"), c.get("value"))
+            for c in await self._jar(context, session)
+        )
+
+    async def _accept_consent(self, page, context, session, events: CdpNetworkEvents):
+        try:
+            result = await page.evaluate(
+                CONSENT_JS, [self.consent_patterns, int(self.consent_timeout * 1000), True]
+            )
+        except Exception as e:
+            print(f"[WARN][consent] {page.url} ({type(e).__name__}: {e})")
+            return
+        if result and result.get("clicked"):
+            where = f" in {result['frame']}" if result.get("frame") else ""
+            print(f"[CONSENT] {page.url} clicked {result.get('text') or result.get('id')!r}{where}")
+
+            await self._wait_stable("consent", events, lambda: self._jar_snapshot(context, session))
+
+    async def _scroll(self, page, events: CdpNetworkEvents):
+        async def height():
+            return await page.evaluate("document.body ? document.body.scrollHeight : 0")
+
+        last_height = await height()
+        for _ in range(self.max_scrolls):
+            await page.evaluate("window.scrollBy(0, window.innerHeight * 0.8)")
+            new_height = await self._wait_stable("scroll", events, height)
+            if new_height == last_height:
+                break
+            last_height = new_height
+
+    async def _open_policy(self, page, url: str):
+        if page.url.rstrip("/") != url.rstrip("/"):
+            await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+        try:
+            await page.wait_for_function(
+                CONTENT_READY_JS, arg=[self._ready_selectors, 500],
+                timeout=10000, polling=250,
+            )
+        except PlaywrightTimeoutError:
+            # Pages without any known container are still worth extracting.
+            pass
+
+    async def visit(self, url: str, pool: BrowserPool,
+                    homepage: bool = True) -> Tuple[Optional[List[dict]], Optional[str]]:
+        """Visit a site's homepage and then ``url``; return (cookies, policy HTML).
+
+        Either part is None when its page could not be loaded. Without
+        ``homepage`` only the policy page is opened and no cookies are read.
+        """
+        root_url = self._get_root_url(url)
+        cookies, html = None, None
+        async with self.limiter.limit(url), pool.context() as context:
+            await context.add_init_script(MUTATION_TRACKER_JS)
+            page = await context.new_page()
+            session = await context.new_cdp_session(page)
+            events = CdpNetworkEvents(session)
+            capture = CookieCapture(events)
+            await events.start()
+
+            homepage_ok = False
+            if homepage:
+                try:
+                    await page.goto(root_url, timeout=60000, wait_until="load")
+                    await self._accept_consent(page, context, session, events)
+                    await self._scroll(page, events)
+                    homepage_ok = True
+                except Exception as e:
+                    print(f"[FAIL][visit] {root_url} ({type(e).__name__}: {e})")
+
+            try:
+                await self._open_policy(page, url)
+                html = await page.content()
+            except Exception as e:
+                print(f"[FAIL][visit] {url} ({type(e).__name__}: {e})")
+
+            if homepage_ok:
+                # Let cookies set by the last responses land before they are read.
+                await self._wait_stable("final", events, lambda: self._jar_snapshot(context, session))
+                cookies = capture.merge(await self._jar(context, session), root_url)
+        return cookies, html
+
+    async def _save_cookies(self, root_url: str, cookies: List[dict]):
+        await self.cookie_writer.insert_doc({
+            "url": root_url,
+            "cookies": cookies,
+            "timestamp": datetime.now().isoformat(),
+        })
+        if self.result_writer is not None:
+            await asyncio.to_thread(self.result_writer.write_site, root_url, cookies)
+        third_party = sum(1 for c in cookies if c["third_party"])
+        print(f"[OK] {root_url} → {len(cookies)} cookies ({third_party} third-party)")
+
+    async def process_url(self, url: str, pool: BrowserPool, checked: bool = False):
+        """Visit the site of a policy URL once and save whatever it still lacks.
+
+        ``checked`` means the scheduler's bulk lookup (``_already_visited``)
+        already ran for this URL; otherwise it is looked up here.
+        """
+        root_url = self._get_root_url(url)
+        if not checked:
+            await self._already_visited([url])
+        need_cookies = root_url not in self._cookie_roots
+        # Claim the root before any await, so other policy URLs of the same
+        # site in flight do not collect its cookies again.
+        self._cookie_roots.add(root_url)
+        need_page = url not in self._stored_pages
+        self._stored_pages.discard(url)
+        if not (need_cookies or need_page):
+            print(f"[SKIP] {url} already visited")
+            return
+
+        try:
+            cookies, html = await self.visit(url, pool, homepage=need_cookies)
+        except Exception as e:
+            print(f"[FAIL][visit] {url} ({type(e).__name__}: {e})")
+            cookies, html = None, None
+
+        if need_cookies:
+            if cookies is None:
+                self._cookie_roots.discard(root_url)
+            else:
+                await self._save_cookies(root_url, cookies)
+
+        if need_page:
+            text, scored_containers = await self._extract(html, url)
+            if html and text:
+                await self.writer.insert_doc(
+                    await self._page_doc(url, html, text, scored_containers, "visit")
+                )
+                print(f"[OK] {url} → saved to database (visit)")
+            else:
+                print(f"[FAIL] Could not scrape {url}")
+
+    async def _flush(self):
+        await self.writer.flush()
+        await self.cookie_writer.flush()
+
+    async def visit_all(self, urls: Iterable[str], parallel: int,
+                        checkpoint: Optional[Checkpoint] = None, result_writer=None):
+        """Visit every site on a pool of ``parallel`` browsers.
+
+        ``urls`` is consumed lazily like in ``scrape_all``. Cookies are also
+        streamed to ``result_writer`` (see ``crawler.result_writer``) when given.
+        """
+        await self._ensure_indexes()
+        self._executor = self._build_executor()
+        self.result_writer = result_writer
+
+        try:
+            async with self.mongo.buffered_async(self.write_batch_size) as writer, \
+                    self.cookie_store.buffered_async(self.write_batch_size) as cookie_writer:
+                self.writer, self.cookie_writer = writer, cookie_writer
+                scheduler = UrlScheduler(
+                    urls, workers=parallel, checkpoint=checkpoint,
+                    skip=self._already_visited, before_save=self._flush,
+                )
+                async with async_playwright() as pw:
+                    async with BrowserPool(pw, size=parallel, max_pages=self.recycle_pages,
+                                           max_memory_mb=self.recycle_memory_mb) as pool:
+                        await scheduler.run(lambda url: self.process_url(url, pool, checked=True))
+        finally:
+            self.writer = self.cookie_writer = self.result_writer = None
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            await close_async_clients()
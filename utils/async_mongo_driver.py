@@ -0,0 +1,122 @@
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from utils.mongo_driver import (
+    AsyncBufferedWriter, bulk_requests, count_duplicates, get_client, resolve_uri,
+)
+from utils.sqlite_store import AsyncSQLiteClient, sqlite_path
+
+_clients: Dict[str, Union[AsyncMongoClient, AsyncSQLiteClient]] = {}
+
+
+def get_async_client(mongo_uri: str, max_pool_size: Optional[int] = None,
+                     min_pool_size: Optional[int] = None) -> Union[AsyncMongoClient, AsyncSQLiteClient]:
+    """Return the process-wide AsyncMongoClient for a URI, creating it on first use.
+
+    Same sharing and pool-size rules as ``utils.mongo_driver.get_client``; a
+    ``sqlite:///path`` URI wraps the shared embedded SQLite client.
+    """
+    client = _clients.get(mongo_uri)
+    if client is None and sqlite_path(mongo_uri) is not None:
+        client = _clients[mongo_uri] = AsyncSQLiteClient(get_client(mongo_uri))
+    if client is None:
+        if max_pool_size is None:
+            max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+        if min_pool_size is None:
+            min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+        client = _clients[mongo_uri] = AsyncMongoClient(
+            mongo_uri, maxPoolSize=max_pool_size, minPoolSize=min_pool_size
+        )
+    return client
+
+
+async def close_async_clients():
+    """Close every shared async client (e.g. at the end of a run)."""
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.close() for client in clients))
+
+
+class AsyncMongoDriver:
+    """``MongoDriver`` for coroutines, on pymongo's native asyncio client.
+
+    Every method of ``MongoDriver`` exists here as a coroutine with the same
+    arguments and results, so database round-trips never block the event loop.
+    """
+
+    def __init__(self, mongo_uri: Optional[str] = None, db_name: str = "privacy_monitor", collection: str = "scraped_pages",
+                 max_pool_size: Optional[int] = None, min_pool_size: Optional[int] = None):
+        self.client = get_async_client(resolve_uri(mongo_uri), max_pool_size, min_pool_size)
+        self.embedded = isinstance(self.client, AsyncSQLiteClient)
+        self.db = self.client[db_name]
+        self.collection = self.db[collection]
+
+    async def already_scraped(self, url: str) -> bool:
+        """Check if a URL is already in MongoDB."""
+        return await self.collection.find_one({"url": url}, {"_id": 1}) is not None
+
+    async def ensure_index(self, field: str, unique: bool = False):
+        """Create an index on field if missing (see ``MongoDriver.ensure_index``)."""
+        try:
+            await self.collection.create_index(field, unique=unique)
+        except OperationFailure as e:
+            if not unique:
+                raise
+            print(f"[WARN] unique index on {self.collection.name}.{field} not created ({e}); using a plain index")
+            try:
+                await self.collection.create_index(field)
+            except OperationFailure:
+                pass
+
+    async def lookup(self, field: str, values: Iterable[str], fields: Iterable[str] = (),
+                     batch_size: int = 1000) -> Dict[str, dict]:
+        """Map each stored value of field among values to its document, one $in query per batch."""
+        projection = {field: 1, "_id": 0, **{f: 1 for f in fields}}
+        values = list(dict.fromkeys(values))
+        found = {}
+        for i in range(0, len(values), batch_size):
+            chunk = values[i:i + batch_size]
+            async for doc in self.collection.find({field: {"$in": chunk}}, projection):
+                found.setdefault(doc[field], doc)
+        return found
+
+    async def existing_values(self, field: str, values: Iterable[str]) -> Set[str]:
+        """Return the subset of values already stored in field."""
+        return set(await self.lookup(field, values))
+
+    async def find_by_url(self, url: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+        """Return the document stored for a URL, optionally only some fields."""
+        projection = {f: 1 for f in fields} if fields else None
+        return await self.collection.find_one({"url": url}, projection)
+
+    async def insert_doc(self, doc: dict):
+        """Insert a document into MongoDB."""
+        await self.collection.insert_one(doc)
+
+    async def replace_doc(self, doc: dict):
+        """Replace the document with the same URL, inserting it if missing."""
+        await self.collection.replace_one({"url": doc["url"]}, doc, upsert=True)
+
+    async def update_fields(self, url: str, fields: dict):
+        """Set some fields on the document of a URL."""
+        await self.collection.update_one({"url": url}, {"$set": fields})
+
+    async def write_batch(self, ops: List[Tuple]) -> int:
+        """Apply buffered operations in one unordered bulk write (see ``MongoDriver.write_batch``)."""
+        if not ops:
+            return 0
+        if self.embedded:
+            return await self.collection.write_ops(ops)
+        try:
+            await self.collection.bulk_write(bulk_requests(ops), ordered=False)
+        except BulkWriteError as e:
+            return count_duplicates(e, len(ops))
+        return 0
+
+    def buffered_async(self, batch_size: int = 500, flush_interval: float = 5.0) -> AsyncBufferedWriter:
+        """Return a writer batching this collection's writes."""
+        return AsyncBufferedWriter(self, batch_size, flush_interval)
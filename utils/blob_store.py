@@ -0,0 +1,114 @@
+import gzip
+import os
+import tempfile
+from typing import Optional
+
+import gridfs
+
+from utils.sqlite_store import SQLiteDatabase
+
+try:
+    import zstandard
+except ImportError:  # gzip keeps working without the optional dependency
+    zstandard = None
+
+
+def compress(data: bytes):
+    """Return (compressed bytes, codec name), preferring zstd."""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd blobs")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+class LocalBlobStore:
+    """Content-addressed blobs stored as files under a local directory."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str, codec: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.{codec}")
+
+    def _find(self, key: str) -> Optional[str]:
+        for codec in ("zstd", "gzip"):
+            path = self._path(key, codec)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, key: str, content: str) -> dict:
+        """Store content under key (its hash) unless already present; return a reference."""
+        existing = self._find(key)
+        if existing:
+            codec = existing.rsplit(".", 1)[1]
+        else:
+            data, codec = compress(content.encode("utf-8"))
+            path = self._path(key, codec)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # A unique temp file per call: threads storing the same page must not share one.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                # Another writer stored the same content first.
+                if not os.path.exists(path):
+                    raise
+        return {"store": self.name, "key": key, "codec": codec}
+
+    def get(self, ref: dict) -> str:
+        with open(self._path(ref["key"], ref["codec"]), "rb") as f:
+            return decompress(f.read(), ref["codec"]).decode("utf-8")
+
+
+class GridFSBlobStore:
+    """Content-addressed blobs stored in a GridFS bucket next to the documents."""
+
+    name = "gridfs"
+
+    def __init__(self, db, bucket: str = "html_blobs"):
+        self.fs = gridfs.GridFS(db, collection=bucket)
+
+    def put(self, key: str, content: str) -> dict:
+        """Store content under key (its hash) unless already present; return a reference."""
+        existing = self.fs.find_one({"_id": key})
+        if existing:
+            codec = existing.codec
+        else:
+            data, codec = compress(content.encode("utf-8"))
+            try:
+                self.fs.put(data, _id=key, codec=codec)
+            except gridfs.errors.FileExists:
+                pass  # stored concurrently by another worker
+        return {"store": self.name, "key": key, "codec": codec}
+
+    def get(self, ref: dict) -> str:
+        return decompress(self.fs.get(ref["key"]).read(), ref["codec"]).decode("utf-8")
+
+
+def open_blob_store(db, blob_dir: Optional[str] = None):
+    """Local directory store when blob_dir is given, GridFS in db otherwise.
+
+    The embedded SQLite backend has no GridFS, so it keeps blobs in a
+    directory next to its database file.
+    """
+    if blob_dir:
+        return LocalBlobStore(blob_dir)
+    if isinstance(db, SQLiteDatabase):
+        return LocalBlobStore(db.blob_dir)
+    return GridFSBlobStore(db)
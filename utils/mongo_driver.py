@@ -1,18 +1,326 @@
-from pymongo import MongoClient
+import asyncio
+import inspect
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pymongo import InsertOne, MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from utils.sqlite_store import SQLiteClient, sqlite_path
+
+DUPLICATE_KEY = 11000
+DEFAULT_URI = "mongodb://localhost:27017"
+
+_clients: Dict[str, Union[MongoClient, SQLiteClient]] = {}
+_clients_lock = threading.Lock()
+
+
+def resolve_uri(mongo_uri: Optional[str] = None) -> str:
+    """The given URI, else the MONGO_URI environment variable, else a local MongoDB."""
+    return mongo_uri or os.environ.get("MONGO_URI", DEFAULT_URI)
+
+
+def get_client(mongo_uri: str, max_pool_size: Optional[int] = None,
+               min_pool_size: Optional[int] = None) -> Union[MongoClient, SQLiteClient]:
+    """Return the process-wide client for a URI, creating it on first use.
+
+    Every driver on the same URI shares one connection pool and one set of
+    monitoring threads. Pool sizes apply when the client is created and
+    default to the MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE environment
+    variables (pymongo's defaults when unset). A ``sqlite:///path`` URI opens
+    the embedded SQLite backend instead of connecting to a server.
+    """
+    with _clients_lock:
+        client = _clients.get(mongo_uri)
+        if client is None and sqlite_path(mongo_uri) is not None:
+            client = _clients[mongo_uri] = SQLiteClient(sqlite_path(mongo_uri))
+        if client is None:
+            if max_pool_size is None:
+                max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+            if min_pool_size is None:
+                min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+            client = _clients[mongo_uri] = MongoClient(
+                mongo_uri, maxPoolSize=max_pool_size, minPoolSize=min_pool_size
+            )
+        return client
+
+
+def bulk_requests(ops: List[Tuple]) -> list:
+    """Turn buffered ("insert" | "replace" | "update", ...) tuples into bulk requests."""
+    requests = []
+    for op in ops:
+        if op[0] == "insert":
+            requests.append(InsertOne(op[1]))
+        elif op[0] == "replace":
+            requests.append(ReplaceOne({"url": op[1]["url"]}, op[1], upsert=True))
+        else:
+            requests.append(UpdateOne({"url": op[1]}, {"$set": op[2]}))
+    return requests
+
+
+def count_duplicates(error: BulkWriteError, total: int) -> int:
+    """Return the duplicate-key failures of a bulk write, reporting any others."""
+    errors = error.details.get("writeErrors", [])
+    others = [err for err in errors if err.get("code") != DUPLICATE_KEY]
+    if others:
+        print(f"[ERROR] {len(others)} of {total} buffered writes failed: {others[0].get('errmsg')}")
+    return len(errors) - len(others)
+
+
+def close_clients():
+    """Close every shared client (e.g. at the end of a run)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
 
 
 class MongoDriver:
-    """Handles MongoDB connection and operations."""
+    """Handles MongoDB connection and operations.
 
-    def __init__(self, mongo_uri: str = "mongodb://localhost:27017", db_name: str = "privacy_monitor", collection: str = "scraped_pages"):
-        self.client = MongoClient(mongo_uri)
+    ``mongo_uri`` defaults to the MONGO_URI environment variable; a
+    ``sqlite:///path`` URI stores everything in an embedded SQLite file.
+    """
+
+    def __init__(self, mongo_uri: Optional[str] = None, db_name: str = "privacy_monitor", collection: str = "scraped_pages",
+                 max_pool_size: Optional[int] = None, min_pool_size: Optional[int] = None):
+        self.client = get_client(resolve_uri(mongo_uri), max_pool_size, min_pool_size)
+        self.embedded = isinstance(self.client, SQLiteClient)
         self.db = self.client[db_name]
         self.collection = self.db[collection]
 
     def already_scraped(self, url: str) -> bool:
         """Check if a URL is already in MongoDB."""
-        return self.collection.find_one({"url": url}) is not None
+        return self.collection.find_one({"url": url}, {"_id": 1}) is not None
+
+    def ensure_index(self, field: str, unique: bool = False):
+        """Create an index on field if missing.
+
+        A unique index that cannot be built (existing duplicates, or a plain
+        index already on the field) falls back to a plain index with a warning.
+        """
+        try:
+            self.collection.create_index(field, unique=unique)
+        except OperationFailure as e:
+            if not unique:
+                raise
+            print(f"[WARN] unique index on {self.collection.name}.{field} not created ({e}); using a plain index")
+            try:
+                self.collection.create_index(field)
+            except OperationFailure:
+                pass
+
+    def lookup(self, field: str, values: Iterable[str], fields: Iterable[str] = (),
+               batch_size: int = 1000) -> Dict[str, dict]:
+        """Map each stored value of field among values to its document.
+
+        Documents carry only the requested fields, and each batch of values
+        costs a single $in query instead of one find_one per value. For a
+        non-unique field the first match is kept, like ``find_one``.
+        """
+        projection = {field: 1, "_id": 0, **{f: 1 for f in fields}}
+        values = list(dict.fromkeys(values))
+        found = {}
+        for i in range(0, len(values), batch_size):
+            chunk = values[i:i + batch_size]
+            for doc in self.collection.find({field: {"$in": chunk}}, projection):
+                found.setdefault(doc[field], doc)
+        return found
+
+    def existing_values(self, field: str, values: Iterable[str]) -> Set[str]:
+        """Return the subset of values already stored in field."""
+        return set(self.lookup(field, values))
+
+    def find_by_url(self, url: str, fields: Optional[List[str]] = None) -> Optional[dict]:
+        """Return the document stored for a URL, optionally only some fields."""
+        projection = {f: 1 for f in fields} if fields else None
+        return self.collection.find_one({"url": url}, projection)
 
     def insert_doc(self, doc: dict):
         """Insert a document into MongoDB."""
         self.collection.insert_one(doc)
+
+    def replace_doc(self, doc: dict):
+        """Replace the document with the same URL, inserting it if missing."""
+        self.collection.replace_one({"url": doc["url"]}, doc, upsert=True)
+
+    def update_fields(self, url: str, fields: dict):
+        """Set some fields on the document of a URL."""
+        self.collection.update_one({"url": url}, {"$set": fields})
+
+    def write_batch(self, ops: List[Tuple]) -> int:
+        """Apply buffered operations in one unordered bulk write.
+
+        ``ops`` holds ("insert", doc), ("replace", doc) and
+        ("update", url, fields) tuples. Duplicate-key failures are skipped
+        (the document is already stored); returns the number of them.
+        """
+        if not ops:
+            return 0
+        if self.embedded:
+            return self.collection.write_ops(ops)
+        try:
+            self.collection.bulk_write(bulk_requests(ops), ordered=False)
+        except BulkWriteError as e:
+            return count_duplicates(e, len(ops))
+        return 0
+
+    def buffered(self, batch_size: int = 500, flush_interval: float = 5.0) -> "BufferedWriter":
+        """Return a writer batching this collection's writes."""
+        return BufferedWriter(self, batch_size, flush_interval)
+
+    def buffered_async(self, batch_size: int = 500, flush_interval: float = 5.0) -> "AsyncBufferedWriter":
+        """Return a writer batching this collection's writes from coroutines."""
+        return AsyncBufferedWriter(self, batch_size, flush_interval)
+
+
+class BufferedWriter:
+    """Collects writes and sends them as unordered bulk writes.
+
+    Pending operations are flushed once ``batch_size`` of them accumulate, when
+    a write arrives more than ``flush_interval`` seconds after the oldest one,
+    on ``flush()`` and when leaving the ``with`` block. Thread-safe.
+    """
+
+    def __init__(self, driver: MongoDriver, batch_size: int = 500, flush_interval: float = 5.0):
+        self.driver = driver
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._ops: List[Tuple] = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def _take_if_due(self, force: bool = False) -> List[Tuple]:
+        with self._lock:
+            due = (
+                force
+                or len(self._ops) >= self.batch_size
+                or (self._ops and time.monotonic() - self._first_at >= self.flush_interval)
+            )
+            if not due or not self._ops:
+                return []
+            ops, self._ops = self._ops, []
+            return ops
+
+    def _add(self, op: Tuple) -> List[Tuple]:
+        with self._lock:
+            if not self._ops:
+                self._first_at = time.monotonic()
+            self._ops.append(op)
+        return self._take_if_due()
+
+    def _restore(self, ops: List[Tuple]):
+        """Put back a batch whose write failed, ahead of newer operations."""
+        with self._lock:
+            if not self._ops:
+                self._first_at = time.monotonic()
+            self._ops[:0] = ops
+
+    def _write(self, ops: List[Tuple]):
+        if not ops:
+            return
+        try:
+            self._report(self.driver.write_batch(ops))
+        except Exception:
+            self._restore(ops)
+            raise
+
+    @staticmethod
+    def _report(duplicates: int):
+        if duplicates:
+            print(f"[SKIP] {duplicates} buffered documents were already stored")
+
+    def insert_doc(self, doc: dict):
+        self._write(self._add(("insert", doc)))
+
+    def replace_doc(self, doc: dict):
+        self._write(self._add(("replace", doc)))
+
+    def update_fields(self, url: str, fields: dict):
+        self._write(self._add(("update", url, fields)))
+
+    def flush(self):
+        """Write everything pending now."""
+        self._write(self._take_if_due(force=True))
+
+
+class AsyncBufferedWriter(BufferedWriter):
+    """BufferedWriter for coroutines: a background task flushes on the interval
+    even when no new writes arrive. Bulk writes are awaited directly on an
+    ``AsyncMongoDriver`` and run in a worker thread for a ``MongoDriver``.
+    """
+
+    def __init__(self, driver: MongoDriver, batch_size: int = 500, flush_interval: float = 5.0):
+        super().__init__(driver, batch_size, flush_interval)
+        self._ticker: Optional[asyncio.Task] = None
+        # One bulk write at a time, so flush() also waits for in-flight batches.
+        self._write_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self._ticker = asyncio.create_task(self._tick())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self._ticker:
+            self._ticker.cancel()
+            self._ticker = None
+        await self.flush()
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._write_async(self._take_if_due())
+
+    async def _send(self, ops: List[Tuple]) -> Optional[Exception]:
+        """Write a batch (holding ``_write_lock``); on failure keep it buffered and return the error."""
+        try:
+            if inspect.iscoroutinefunction(self.driver.write_batch):
+                duplicates = await self.driver.write_batch(ops)
+            else:
+                duplicates = await asyncio.to_thread(self.driver.write_batch, ops)
+        except Exception as e:
+            self._restore(ops)
+            print(f"[FAIL][write] {len(ops)} buffered operations kept for retry ({type(e).__name__}: {e})")
+            return e
+        self._report(duplicates)
+        return None
+
+    async def _write_async(self, ops: List[Tuple]):
+        """Write a due batch; a failed one stays buffered for the next flush."""
+        if ops:
+            async with self._write_lock:
+                await self._send(ops)
+
+    async def insert_doc(self, doc: dict):
+        await self._write_async(self._add(("insert", doc)))
+
+    async def replace_doc(self, doc: dict):
+        await self._write_async(self._add(("replace", doc)))
+
+    async def update_fields(self, url: str, fields: dict):
+        await self._write_async(self._add(("update", url, fields)))
+
+    async def flush(self):
+        """Write everything pending and wait until earlier batches are stored.
+
+        Ops are taken under ``_write_lock``, so a batch that failed while in
+        flight is retried here too. Raises if anything could not be stored, so
+        a caller saving a checkpoint after the flush never skips unstored
+        documents.
+        """
+        async with self._write_lock:
+            while True:
+                ops = self._take_if_due(force=True)
+                if not ops:
+                    return
+                error = await self._send(ops)
+                if error is not None:
+                    raise error
@@ -0,0 +1,316 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][\w.]*$")
+SQLITE_PREFIX = "sqlite:///"
+# Same code MongoDB reports for duplicate keys, so callers handle both alike.
+DUPLICATE_KEY_CODE = 11000
+
+
+def sqlite_path(uri: str) -> Optional[str]:
+    """File path of a ``sqlite:///path`` URI (``sqlite:////abs/path`` for absolute), else None."""
+    if not uri.startswith(SQLITE_PREFIX):
+        return None
+    return uri[len(SQLITE_PREFIX):] or ":memory:"
+
+
+def _path(field: str) -> str:
+    """JSON1 expression for a (dotted) field; indexes and queries must use the same text."""
+    if not _FIELD_RE.match(field):
+        raise ValueError(f"Unsupported field name: {field!r}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _sql_value(value: Any) -> Any:
+    # json_extract yields 1/0 for JSON booleans.
+    return int(value) if isinstance(value, bool) else value
+
+
+def _where(query: Optional[dict]) -> Tuple[str, list]:
+    """Translate the query subset used by the pipeline (equality and $in) to SQL."""
+    clauses, params = [], []
+    for field, cond in (query or {}).items():
+        expr = _path(field)
+        if isinstance(cond, dict):
+            if set(cond) != {"$in"}:
+                raise NotImplementedError(f"Query operators {sorted(cond)} are not supported by the SQLite backend")
+            values = [_sql_value(v) for v in cond["$in"]]
+            if not values:
+                clauses.append("0")
+                continue
+            clauses.append(f"{expr} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        elif cond is None:
+            clauses.append(f"{expr} IS NULL")
+        else:
+            clauses.append(f"{expr} = ?")
+            params.append(_sql_value(cond))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = [f for f, on in projection.items() if on and f != "_id"]
+    if not fields:
+        # Exclusion-only projection, e.g. {"_id": 0}.
+        return {k: v for k, v in doc.items() if k != "_id" or include_id}
+    out = {f: doc[f] for f in fields if f in doc}
+    if include_id and "_id" in doc:
+        out["_id"] = doc["_id"]
+    return out
+
+
+class SQLiteCollection:
+    """Documents of one collection stored as JSON in a SQLite table.
+
+    Implements the part of pymongo's ``Collection`` the pipeline uses:
+    ``find``/``find_one`` with equality and ``$in`` filters and inclusion
+    projections, ``insert_one``, ``replace_one``, ``update_one`` with
+    ``$set`` and ``create_index`` (a JSON1 expression index).
+    """
+
+    def __init__(self, client: "SQLiteClient", table: str, name: str):
+        self.client = client
+        self.table = table
+        self.name = name
+        self.client.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY, doc TEXT NOT NULL)')
+
+    def _rows(self, query: Optional[dict], limit: Optional[int] = None) -> List[Tuple[int, dict]]:
+        where, params = _where(query)
+        sql = f'SELECT id, doc FROM "{self.table}"{where}'
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [(row_id, json_util.loads(doc)) for row_id, doc in self.client.execute(sql, params)]
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> List[dict]:
+        return [_project(doc, projection) for _, doc in self._rows(query)]
+
+    def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        rows = self._rows(query, limit=1)
+        return _project(rows[0][1], projection) if rows else None
+
+    def _insert(self, doc: dict):
+        doc.setdefault("_id", ObjectId())
+        self.client.execute(f'INSERT INTO "{self.table}" (doc) VALUES (?)', [json_util.dumps(doc)])
+
+    def _replace(self, row_id: int, old: dict, doc: dict):
+        doc = {**doc, "_id": old.get("_id", doc.get("_id"))}
+        self.client.execute(f'UPDATE "{self.table}" SET doc = ? WHERE id = ?', [json_util.dumps(doc), row_id])
+
+    def _replace_one(self, query: dict, doc: dict, upsert: bool):
+        rows = self._rows(query, limit=1)
+        if rows:
+            self._replace(rows[0][0], rows[0][1], doc)
+        elif upsert:
+            self._insert(dict(doc))
+
+    def _update_one(self, query: dict, update: dict):
+        if set(update) != {"$set"}:
+            raise NotImplementedError("Only $set updates are supported by the SQLite backend")
+        rows = self._rows(query, limit=1)
+        if rows:
+            row_id, old = rows[0]
+            self._replace(row_id, old, {**old, **update["$set"]})
+
+    def insert_one(self, doc: dict):
+        with self.client.transaction():
+            try:
+                self._insert(doc)
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(str(e), DUPLICATE_KEY_CODE)
+
+    def replace_one(self, query: dict, doc: dict, upsert: bool = False):
+        with self.client.transaction():
+            try:
+                self._replace_one(query, doc, upsert)
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(str(e), DUPLICATE_KEY_CODE)
+
+    def update_one(self, query: dict, update: dict):
+        with self.client.transaction():
+            try:
+                self._update_one(query, update)
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(str(e), DUPLICATE_KEY_CODE)
+
+    def write_ops(self, ops: List[Tuple]) -> int:
+        """Apply buffered ("insert" | "replace" | "update", ...) tuples in one
+        transaction, skipping duplicates like an unordered bulk write; returns their count."""
+        duplicates = 0
+        with self.client.transaction():
+            for op in ops:
+                try:
+                    if op[0] == "insert":
+                        self._insert(op[1])
+                    elif op[0] == "replace":
+                        self._replace_one({"url": op[1]["url"]}, op[1], upsert=True)
+                    else:
+                        self._update_one({"url": op[1]}, {"$set": op[2]})
+                except sqlite3.IntegrityError:
+                    duplicates += 1
+        return duplicates
+
+    def create_index(self, field: str, unique: bool = False):
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        name = f"{self.table}.{field}" + (".unique" if unique else "")
+        try:
+            self.client.execute(f'CREATE {kind} IF NOT EXISTS "{name}" ON "{self.table}" ({_path(field)})')
+        except sqlite3.IntegrityError as e:
+            raise OperationFailure(f"duplicate values for {field}: {e}", DUPLICATE_KEY_CODE)
+
+
+class SQLiteDatabase:
+    """A database name inside a SQLite file; collections become ``db.collection`` tables."""
+
+    def __init__(self, client: "SQLiteClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, SQLiteCollection] = {}
+
+    def __getitem__(self, collection: str) -> SQLiteCollection:
+        if collection not in self._collections:
+            self._collections[collection] = SQLiteCollection(self.client, f"{self.name}.{collection}", collection)
+        return self._collections[collection]
+
+    @property
+    def blob_dir(self) -> str:
+        """Directory for raw HTML blobs, next to the database file."""
+        if self.client.path == ":memory:":
+            return "html_blobs"
+        return f"{os.path.splitext(self.client.path)[0]}_blobs"
+
+
+class SQLiteClient:
+    """Embedded stand-in for ``MongoClient`` backed by a single SQLite file.
+
+    One connection is shared by all threads behind a lock; WAL mode lets
+    other processes (e.g. the extractor while the scraper runs) read and
+    write the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._depth = 0
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._databases: Dict[str, SQLiteDatabase] = {}
+
+    def __getitem__(self, name: str) -> SQLiteDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = SQLiteDatabase(self, name)
+            return self._databases[name]
+
+    def execute(self, sql: str, params: Optional[list] = None) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params or []).fetchall()
+
+    def transaction(self) -> "_Transaction":
+        """Context manager grouping statements into one (nestable) transaction."""
+        return _Transaction(self)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, client: SQLiteClient):
+        self.client = client
+
+    def __enter__(self):
+        self.client._lock.acquire()
+        if self.client._depth == 0:
+            try:
+                self.client._conn.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                # e.g. "database is locked": other threads must not wait on us forever.
+                self.client._lock.release()
+                raise
+        self.client._depth += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.client._depth -= 1
+            if self.client._depth == 0:
+                self.client._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.client._lock.release()
+
+
+class _AsyncResults:
+    """Async iterator over a ``find`` that runs in a worker thread."""
+
+    def __init__(self, collection: SQLiteCollection, query: Optional[dict], projection: Optional[dict]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+
+    async def __aiter__(self):
+        for doc in await asyncio.to_thread(self.collection.find, self.query, self.projection):
+            yield doc
+
+
+class AsyncSQLiteCollection:
+    """Coroutine view of a ``SQLiteCollection`` for ``AsyncMongoDriver``."""
+
+    def __init__(self, collection: SQLiteCollection):
+        self.sync = collection
+        self.name = collection.name
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> _AsyncResults:
+        return _AsyncResults(self.sync, query, projection)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        return await asyncio.to_thread(self.sync.find_one, query, projection)
+
+    async def insert_one(self, doc: dict):
+        await asyncio.to_thread(self.sync.insert_one, doc)
+
+    async def replace_one(self, query: dict, doc: dict, upsert: bool = False):
+        await asyncio.to_thread(self.sync.replace_one, query, doc, upsert)
+
+    async def update_one(self, query: dict, update: dict):
+        await asyncio.to_thread(self.sync.update_one, query, update)
+
+    async def write_ops(self, ops: List[Tuple]) -> int:
+        return await asyncio.to_thread(self.sync.write_ops, ops)
+
+    async def create_index(self, field: str, unique: bool = False):
+        await asyncio.to_thread(self.sync.create_index, field, unique)
+
+
+class AsyncSQLiteDatabase:
+    def __init__(self, db: SQLiteDatabase):
+        self.sync = db
+        self.name = db.name
+
+    def __getitem__(self, collection: str) -> AsyncSQLiteCollection:
+        return AsyncSQLiteCollection(self.sync[collection])
+
+
+class AsyncSQLiteClient:
+    """Coroutine view of a shared ``SQLiteClient``; closing is left to the sync registry."""
+
+    def __init__(self, client: SQLiteClient):
+        self.sync = client
+
+    def __getitem__(self, name: str) -> AsyncSQLiteDatabase:
+        return AsyncSQLiteDatabase(self.sync[name])
+
+    async def close(self):
+        pass